@@ -7,6 +7,17 @@ import importlib
 import os
 import sys
 
+from .import_report import REPORT_FILE, ImportReport, format_slowest
+from .node_manifest import (
+    MANIFEST_FILE,
+    file_signature,
+    lazy_load_enabled,
+    load_manifest,
+    make_lazy_node,
+    save_manifest,
+    snapshot_module,
+)
+
 # 设置Web目录，用于加载前端资源
 WEB_DIRECTORY = "web"
 
@@ -15,6 +26,9 @@ WEB_DIRECTORY = "web"
 NODE_CLASS_MAPPINGS = {}
 NODE_DISPLAY_NAME_MAPPINGS = {}
 
+# 记录每个模块的导入耗时和峰值内存
+IMPORT_REPORT = ImportReport()
+
 def get_ext_dir(subpath=None, mkdir=False):
     """获取扩展目录路径"""
     dir = os.path.dirname(__file__)
@@ -23,7 +37,8 @@ def get_ext_dir(subpath=None, mkdir=False):
     return os.path.abspath(dir)
 
 def safe_import_module(module_path, file_name):
-    """安全导入模块，避免导入错误导致崩溃"""
+    """安全导入模块，避免导入错误导致崩溃，成功时返回模块对象"""
+    start = IMPORT_REPORT.start()
     try:
         imported_module = importlib.import_module(module_path)
         
@@ -35,29 +50,80 @@ def safe_import_module(module_path, file_name):
         if hasattr(imported_module, 'NODE_DISPLAY_NAME_MAPPINGS'):
             NODE_DISPLAY_NAME_MAPPINGS.update(imported_module.NODE_DISPLAY_NAME_MAPPINGS)
             
-        return True
+        IMPORT_REPORT.record(file_name, start, True)
+        return imported_module
         
     except Exception as e:
+        IMPORT_REPORT.record(file_name, start, False)
         print(f"❌ 加载模块 {file_name} 失败: {e}")
-        return False
+        return None
+
+def register_from_manifest(py_dir, files):
+    """
+    延迟注册模式：未改动的模块直接用清单快照注册代理节点，不导入模块
+    新增或 mtime 变化的模块正常导入，并重新生成其清单条目
+    """
+    manifest_path = get_ext_dir(MANIFEST_FILE)
+    manifest = load_manifest(manifest_path)
+    modules = {}
+    changed = False
+    lazy_count = 0
+
+    for file in files:
+        module_name = os.path.splitext(file)[0]
+        module_path = f"{__name__}.py.{module_name}"
+        signature = file_signature(os.path.join(py_dir, file))
+        entry = manifest["modules"].get(module_name)
+
+        if entry is not None and entry.get("signature") == signature:
+            modules[module_name] = entry
+            if entry["lazy"]:
+                for class_name, snapshot in entry["nodes"].items():
+                    NODE_CLASS_MAPPINGS[class_name] = make_lazy_node(module_path, class_name, snapshot)
+                NODE_DISPLAY_NAME_MAPPINGS.update(entry["display_names"])
+                lazy_count += 1
+            else:
+                safe_import_module(module_path, file)
+            continue
+
+        # 清单中没有或文件已改动：导入模块并刷新条目，导入失败的模块不写入清单，下次启动重试
+        changed = True
+        imported_module = safe_import_module(module_path, file)
+        if imported_module is not None:
+            entry = snapshot_module(imported_module)
+            entry["signature"] = signature
+            modules[module_name] = entry
+
+    if changed or set(modules) != set(manifest["modules"]):
+        manifest["modules"] = modules
+        save_manifest(manifest_path, manifest)
+
+    if lazy_count:
+        print(f"⚡ 延迟注册模式: {lazy_count} 个模块从清单注册，首次执行时导入")
 
 # 动态扫描并加载 py/ 目录下的所有模块
 py_dir = get_ext_dir("py")
 
 if os.path.exists(py_dir):
-    files = os.listdir(py_dir)
+    files = sorted(
+        file for file in os.listdir(py_dir)
+        if file.endswith(".py") and not file.startswith("_")
+    )
     
-    for file in files:
-        if not file.endswith(".py") or file.startswith("_"):
-            continue
-        
-        module_name = os.path.splitext(file)[0]
-        module_path = f"{__name__}.py.{module_name}"
-        
-        safe_import_module(module_path, file)
+    if lazy_load_enabled():
+        register_from_manifest(py_dir, files)
+    else:
+        for file in files:
+            module_name = os.path.splitext(file)[0]
+            module_path = f"{__name__}.py.{module_name}"
+            
+            safe_import_module(module_path, file)
 else:
     print(f"警告: py目录不存在: {py_dir}")
 
+# 写入导入耗时报告
+import_report = IMPORT_REPORT.write(get_ext_dir(REPORT_FILE))
+
 # 显示加载信息
 if NODE_CLASS_MAPPINGS:
     print("=" * 50)
@@ -67,6 +133,8 @@ if NODE_CLASS_MAPPINGS:
     print("📋 已加载的节点:")
     for name, display_name in NODE_DISPLAY_NAME_MAPPINGS.items():
         print(f"  • {display_name}")
+    print(f"⏱️  导入耗时: {import_report['total_seconds']:.2f}s（详见 {REPORT_FILE}），最慢的模块:")
+    print(format_slowest(import_report))
     print("=" * 50)
 else:
     print("⚠️  警告: 没有找到任何可用的节点")
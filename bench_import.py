@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+节点套件冷启动导入耗时基准
+用法:
+  python bench_import.py                 # 与 import_baseline.json 比较，超出容差时返回非 0
+  python bench_import.py --update        # 用本次结果更新基准
+  python bench_import.py --comfyui-dir D:/ComfyUI --runs 5 --tolerance 0.2
+
+每次测量都在新的 Python 进程中导入本插件，读取 __init__.py 生成的 import_report.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from import_report import REPORT_FILE
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_FILE = os.path.join(BASE_DIR, "import_baseline.json")
+
+# 子进程中按 ComfyUI 的方式加载插件目录
+CHILD_CODE = """
+import importlib.util, os, sys
+pkg_dir = sys.argv[1]
+name = os.path.basename(pkg_dir)
+spec = importlib.util.spec_from_file_location(
+    name, os.path.join(pkg_dir, "__init__.py"), submodule_search_locations=[pkg_dir])
+module = importlib.util.module_from_spec(spec)
+sys.modules[name] = module
+spec.loader.exec_module(module)
+"""
+
+
+def run_once(comfyui_dir=None):
+    """在新进程中导入一次插件，返回导入报告"""
+    env = dict(os.environ)
+    if comfyui_dir:
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [comfyui_dir, env.get("PYTHONPATH")]))
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD_CODE, BASE_DIR],
+        cwd=comfyui_dir or BASE_DIR,
+        env=env,
+        capture_output=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"导入插件失败:\n{result.stderr.decode('utf-8', errors='ignore')}")
+    with open(os.path.join(BASE_DIR, REPORT_FILE), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def summarize(reports):
+    """多次测量取中位数，降低偶发抖动的影响"""
+    modules = {}
+    for report in reports:
+        for m in report["modules"]:
+            modules.setdefault(m["module"], []).append(m["seconds"])
+    return {
+        "total_seconds": statistics.median(r["total_seconds"] for r in reports),
+        "peak_rss_kb": max((r["peak_rss_kb"] or 0) for r in reports) or None,
+        "failed": reports[-1]["failed"],
+        "modules": {name: statistics.median(times) for name, times in modules.items()},
+    }
+
+
+def print_regressions(current, baseline, count=10):
+    """打印相对基准变慢最多的模块"""
+    old_modules = baseline.get("modules", {})
+    diffs = sorted(
+        ((seconds - old_modules.get(name, 0.0), name) for name, seconds in current["modules"].items()),
+        reverse=True,
+    )
+    print("相对基准变化最大的模块:")
+    for diff, name in diffs[:count]:
+        print(f"  • {name}: {current['modules'][name] * 1000:.1f} ms ({diff * 1000:+.1f} ms)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Comfyui_PDuse 导入耗时基准")
+    parser.add_argument("--runs", type=int, default=3, help="测量次数，取中位数")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="允许超出基准的比例")
+    parser.add_argument("--comfyui-dir", default=None, help="ComfyUI 根目录，用于解析 comfy/folder_paths")
+    parser.add_argument("--update", action="store_true", help="用本次结果更新基准")
+    args = parser.parse_args()
+
+    reports = [run_once(args.comfyui_dir) for _ in range(max(1, args.runs))]
+    current = summarize(reports)
+    print(f"导入总耗时(中位数): {current['total_seconds']:.3f}s，峰值内存: {current['peak_rss_kb']} KB")
+    if current["failed"]:
+        print(f"⚠️  导入失败的模块: {', '.join(current['failed'])}")
+
+    if args.update or not os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE, "w", encoding="utf-8") as f:
+            json.dump(current, f, ensure_ascii=False, indent=2)
+        print(f"✅ 已写入基准: {BASELINE_FILE}")
+        return 0
+
+    with open(BASELINE_FILE, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    limit = baseline["total_seconds"] * (1 + args.tolerance)
+    print_regressions(current, baseline)
+    if current["total_seconds"] > limit:
+        print(f"❌ 导入耗时 {current['total_seconds']:.3f}s 超出基准 {baseline['total_seconds']:.3f}s "
+              f"(容差 {args.tolerance:.0%})")
+        return 1
+    print(f"✅ 导入耗时在基准范围内 (上限 {limit:.3f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+节点处理耗时基准（合成数据，不需要 ComfyUI）
+用法:
+  python bench_nodes.py                          # 运行全部用例
+  python bench_nodes.py maskfenkai --objects 2000 --runs 5
+  python bench_nodes.py save_metadata --objects 2000  # 工作流含 2000 个节点
+  python bench_nodes.py save_profiles --frames 16     # 各保存档位的编码速度与体积
+
+只导入被测的节点模块，不会执行 __init__.py 加载全部节点
+"""
+
+import argparse
+import importlib
+import os
+import statistics
+import sys
+import time
+import types
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PACKAGE_NAME = "pduse_bench"
+
+
+def import_node_module(module_name):
+    """以包内子模块的方式导入 py/ 下的节点文件，支持其中的相对导入"""
+    if PACKAGE_NAME not in sys.modules:
+        package = types.ModuleType(PACKAGE_NAME)
+        package.__path__ = [BASE_DIR]
+        sys.modules[PACKAGE_NAME] = package
+    return importlib.import_module(f"{PACKAGE_NAME}.py.{module_name}")
+
+
+def timed(func, runs):
+    """多次运行取中位数，返回 (中位数秒数, 最后一次的结果)"""
+    times = []
+    result = None
+    for _ in range(max(1, runs)):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), result
+
+
+def synthetic_sheet(objects, cell=48, jitter=6, seed=0):
+    """
+    生成贴纸拼版：黑色前景、白色背景的圆形网格，每行有少量上下错位
+    返回 (image [1, H, W, 3], mask [1, H, W])
+    """
+    import numpy as np
+    import torch
+    import cv2
+
+    rng = np.random.default_rng(seed)
+    cols = max(1, int(objects ** 0.5))
+    rows = (objects + cols - 1) // cols
+    mask = np.ones((rows * cell, cols * cell), dtype=np.float32)
+    radius = cell // 2 - jitter - 2
+    for i in range(objects):
+        r, c = divmod(i, cols)
+        cx = c * cell + cell // 2 + int(rng.integers(-jitter, jitter + 1))
+        cy = r * cell + cell // 2 + int(rng.integers(-jitter, jitter + 1))
+        cv2.circle(mask, (cx, cy), radius, 0.0, -1)
+    image = torch.rand((1, mask.shape[0], mask.shape[1], 3))
+    return image, torch.from_numpy(mask).unsqueeze(0)
+
+
+def synthetic_frame(width=1024, height=1024, seed=0):
+    """生成平滑渐变加少量噪声的 RGB uint8 图像，压缩特性接近生成图"""
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    base = np.stack([x / width, y / height, (x + y) / (width + height)], axis=-1) * 255
+    noise = rng.normal(0, 4, size=base.shape)
+    return np.clip(base + noise, 0, 255).astype(np.uint8)
+
+
+def synthetic_corpus(frames, size=1024):
+    """固定的图像集合：偶数帧为渐变加噪声（接近照片），奇数帧为大色块（接近插画、截图）"""
+    import numpy as np
+
+    corpus = []
+    for i in range(frames):
+        if i % 2 == 0:
+            corpus.append(synthetic_frame(size, size, seed=i))
+        else:
+            rng = np.random.default_rng(i)
+            blocks = rng.integers(0, 256, size=(16, 16, 3), dtype=np.uint8)
+            corpus.append(np.repeat(np.repeat(blocks, size // 16, axis=0), size // 16, axis=1))
+    return corpus
+
+
+def synthetic_workflow(nodes, seed=0):
+    """生成含 nodes 个节点的 (prompt, extra_pnginfo)，结构与 ComfyUI 保存的工作流相近"""
+    import random
+
+    rng = random.Random(seed)
+    prompt = {}
+    workflow_nodes = []
+    for i in range(nodes):
+        text = " ".join(f"token{rng.randrange(5000)}" for _ in range(40))
+        prompt[str(i)] = {
+            "class_type": f"Node{i % 50}",
+            "inputs": {"seed": rng.randrange(2 ** 32), "text": text, "model": [str(max(0, i - 1)), 0]},
+        }
+        workflow_nodes.append({
+            "id": i, "type": f"Node{i % 50}", "pos": [rng.random() * 4000, rng.random() * 4000],
+            "size": [320, 180], "flags": {}, "order": i, "mode": 0,
+            "inputs": [{"name": "model", "type": "MODEL", "link": i}],
+            "outputs": [{"name": "MODEL", "type": "MODEL", "links": [i + 1]}],
+            "widgets_values": [rng.randrange(2 ** 32), "randomize", text],
+        })
+    links = [[i + 1, i, 0, i + 1, 0, "MODEL"] for i in range(nodes)]
+    return prompt, {"workflow": {"nodes": workflow_nodes, "links": links, "version": 0.4}}
+
+
+def bench_save_metadata(args):
+    import io
+    from PIL import Image
+
+    writer = import_node_module("_save_writer")
+    prompt, extra_pnginfo = synthetic_workflow(args.objects)
+    frames = [Image.fromarray(synthetic_frame(512, 512, seed=i)) for i in range(args.frames)]
+    print(f"PNG 元数据: 工作流 {args.objects} 个节点，{args.frames} 帧 512×512")
+    for compress in (False, True):
+        seconds, _ = timed(lambda: writer.png_metadata(prompt, extra_pnginfo, compress), args.runs)
+        print(f"  • 序列化一次{'（zTXt）' if compress else ''}: {seconds * 1000:.1f} ms")
+
+    def save_batch(per_frame, compress):
+        sizes = []
+        metadata = None if per_frame else writer.png_metadata(prompt, extra_pnginfo, compress)
+        for frame in frames:
+            buffer = io.BytesIO()
+            frame.save(buffer, format="PNG", compress_level=4,
+                       pnginfo=metadata or writer.png_metadata(prompt, extra_pnginfo, compress))
+            sizes.append(buffer.tell())
+        return sizes
+
+    for label, per_frame, compress in (("逐帧序列化", True, False), ("整批一次", False, False),
+                                       ("整批一次 + zTXt", False, True)):
+        seconds, sizes = timed(lambda: save_batch(per_frame, compress), args.runs)
+        print(f"  • {label}: 每帧 {seconds / len(frames) * 1000:.1f} ms，文件 {sizes[0] / 1024:.0f} KB")
+
+
+def bench_save_profiles(args):
+    import io
+    from PIL import Image
+
+    writer = import_node_module("_save_writer")
+    corpus = [Image.fromarray(frame) for frame in synthetic_corpus(args.frames)]
+    raw_mb = sum(image.width * image.height * 3 for image in corpus) / (1024 * 1024)
+    print(f"保存档位: {len(corpus)} 帧 1024×1024（照片/色块各半），原始数据 {raw_mb:.0f} MB")
+
+    def encode_all(image_format, options):
+        total = 0
+        for image in corpus:
+            buffer = io.BytesIO()
+            image.save(buffer, format=image_format, **options)
+            total += buffer.tell()
+        return total
+
+    for image_format, extra in (("PNG", {}), ("JPEG", {"quality": 95}), ("WEBP", {"quality": 95})):
+        for profile in writer.SAVE_PROFILE_NAMES:
+            options = {**extra, **writer.save_options(image_format, profile)}
+            seconds, total = timed(lambda: encode_all(image_format, options), args.runs)
+            print(f"  • {image_format} {profile}: {raw_mb / seconds:.1f} MB/s，"
+                  f"平均 {total / len(corpus) / 1024:.0f} KB/帧")
+
+
+def bench_maskfenkai(args):
+    node = import_node_module("Maskfenkai").PD_Maskfenkai()
+    image, mask = synthetic_sheet(args.objects)
+    print(f"PD_Maskfenkai: {args.objects} 个对象，画面 {mask.shape[2]}×{mask.shape[1]}")
+    for split_iterations in (0, 2):
+        seconds, (images, _) = timed(
+            lambda: node.split_objects(image, mask, min_area=10, row_tolerance=20,
+                                       split_iterations=split_iterations, bbox_padding=4),
+            args.runs,
+        )
+        print(f"  • split_iterations={split_iterations}: {seconds * 1000:.1f} ms，输出 {len(images)} 个")
+
+
+CASES = {
+    "maskfenkai": bench_maskfenkai,
+    "save_metadata": bench_save_metadata,
+    "save_profiles": bench_save_profiles,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Comfyui_PDuse 节点处理耗时基准")
+    parser.add_argument("cases", nargs="*", help=f"要运行的用例（{', '.join(CASES)}），默认全部")
+    parser.add_argument("--runs", type=int, default=3, help="测量次数，取中位数")
+    parser.add_argument("--objects", type=int, default=1000, help="合成拼版中的对象数量 / 合成工作流的节点数")
+    parser.add_argument("--frames", type=int, default=8, help="保存类用例每批的帧数")
+    args = parser.parse_args()
+
+    unknown = [name for name in args.cases if name not in CASES]
+    if unknown:
+        parser.error(f"未知用例: {', '.join(unknown)}")
+
+    for name in args.cases or list(CASES):
+        CASES[name](args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
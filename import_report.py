@@ -0,0 +1,80 @@
+"""
+启动导入耗时报告
+记录 __init__.py 加载 py/ 模块时每个模块的耗时和进程峰值内存，写入 import_report.json
+"""
+
+import json
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # Windows 没有 resource 模块，峰值内存记为 None
+    resource = None
+
+REPORT_FILE = "import_report.json"
+
+
+def peak_rss_kb():
+    """当前进程的峰值常驻内存（KB），不支持的平台返回 None"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 返回字节，Linux 返回 KB
+    if sys.platform == "darwin":
+        peak //= 1024
+    return peak
+
+
+class ImportReport:
+    """按模块累计导入耗时，最后写成 JSON 报告"""
+
+    def __init__(self):
+        self.modules = []
+        self.started = time.perf_counter()
+
+    def start(self):
+        """开始计时一个模块，返回给 record 使用的起点"""
+        return time.perf_counter(), peak_rss_kb()
+
+    def record(self, file_name, start, ok):
+        started, rss_before = start
+        rss_after = peak_rss_kb()
+        self.modules.append({
+            "module": file_name,
+            "seconds": round(time.perf_counter() - started, 6),
+            "peak_rss_kb": rss_after,
+            "peak_rss_delta_kb": None if rss_after is None else rss_after - rss_before,
+            "ok": ok,
+        })
+
+    def to_dict(self):
+        modules = sorted(self.modules, key=lambda m: m["seconds"], reverse=True)
+        return {
+            "generated_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "python": sys.version.split()[0],
+            "total_seconds": round(time.perf_counter() - self.started, 6),
+            "import_seconds": round(sum(m["seconds"] for m in modules), 6),
+            "peak_rss_kb": peak_rss_kb(),
+            "module_count": len(modules),
+            "failed": sorted(m["module"] for m in modules if not m["ok"]),
+            "modules": modules,
+        }
+
+    def write(self, path):
+        """写入报告，插件目录只读时静默跳过"""
+        report = self.to_dict()
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+        except OSError as e:
+            print(f"⚠️  写入导入耗时报告失败: {e}")
+        return report
+
+
+def format_slowest(report, count=5):
+    """生成最慢模块的摘要文本"""
+    lines = []
+    for m in report["modules"][:count]:
+        lines.append(f"  • {m['module']}: {m['seconds'] * 1000:.1f} ms")
+    return "\n".join(lines)
@@ -0,0 +1,223 @@
+"""
+节点清单（manifest）与延迟注册
+启动时读取生成好的 node_manifest.json，用快照发布节点目录，真正的模块在节点第一次执行时才导入
+"""
+
+import importlib
+import json
+import os
+import types
+
+# 2: INPUT_TYPES 读取文件系统的模块改为即时加载，旧清单需要重新生成
+MANIFEST_VERSION = 2
+MANIFEST_FILE = "node_manifest.json"
+
+# 环境变量开启延迟注册模式：PDUSE_LAZY_LOAD=1
+LAZY_ENV_VAR = "PDUSE_LAZY_LOAD"
+
+# 节点类上需要写入快照的属性
+SNAPSHOT_ATTRS = (
+    "RETURN_TYPES",
+    "RETURN_NAMES",
+    "FUNCTION",
+    "CATEGORY",
+    "OUTPUT_NODE",
+    "INPUT_IS_LIST",
+    "OUTPUT_IS_LIST",
+    "OUTPUT_TOOLTIPS",
+    "DESCRIPTION",
+)
+
+# 这些属性在 ComfyUI 中按元组使用，JSON 往返后需要还原
+TUPLE_ATTRS = ("RETURN_TYPES", "RETURN_NAMES", "OUTPUT_IS_LIST", "OUTPUT_TOOLTIPS")
+
+
+def lazy_load_enabled():
+    """是否开启了延迟注册模式"""
+    return os.environ.get(LAZY_ENV_VAR, "").strip().lower() in ("1", "true", "yes", "on")
+
+
+def load_manifest(path):
+    """读取清单文件，版本不符或损坏时返回空清单"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") == MANIFEST_VERSION and isinstance(manifest.get("modules"), dict):
+            return manifest
+    except (OSError, ValueError):
+        pass
+    return {"version": MANIFEST_VERSION, "modules": {}}
+
+
+def save_manifest(path, manifest):
+    """先写临时文件再替换，避免多个进程同时启动时读到半截文件"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"⚠️  写入节点清单失败: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def file_signature(file_path):
+    """用 mtime 和文件大小判断模块是否改动过"""
+    st = os.stat(file_path)
+    return {"mtime": st.st_mtime_ns, "size": st.st_size}
+
+
+def _is_plain(value):
+    """只有纯 JSON 数据才能安全地写入快照（AnyType 这类 str 子类会丢失行为）"""
+    if value is None or type(value) in (str, int, float, bool):
+        return True
+    if type(value) in (list, tuple):
+        return all(_is_plain(v) for v in value)
+    if type(value) is dict:
+        return all(type(k) is str and _is_plain(v) for k, v in value.items())
+    return False
+
+
+# INPUT_TYPES 中引用这些模块（或 open）时，选项来自磁盘或 ComfyUI 的模型目录，快照会过期
+DYNAMIC_MODULES = ("os", "glob", "pathlib", "shutil", "folder_paths", "nodes", "comfy")
+
+
+def _code_objects(code):
+    """函数代码及其内部的推导式、嵌套函数"""
+    yield code
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            yield from _code_objects(const)
+
+
+def _reads_environment(func, owner=None, seen=None):
+    """
+    检查函数（及其调用的同模块函数、owner 类上的方法）是否读取文件系统或 folder_paths
+    例如加载图片节点列出 input 目录、字体和 lora 下拉框，这类 INPUT_TYPES 每次调用结果都可能不同
+    """
+    seen = set() if seen is None else seen
+    if func in seen:
+        return False
+    seen.add(func)
+    module_globals = func.__globals__
+    for code in _code_objects(func.__code__):
+        for name in code.co_names:
+            if name == "open" and name not in module_globals:
+                return True
+            value = module_globals.get(name)
+            if value is None and owner is not None:
+                # cls.helper() 这类调用
+                value = getattr(getattr(owner, name, None), "__func__", getattr(owner, name, None))
+            if isinstance(value, types.ModuleType):
+                if value.__name__.split(".")[0] in DYNAMIC_MODULES:
+                    return True
+            elif isinstance(value, types.FunctionType) and value.__module__ == func.__module__:
+                if _reads_environment(value, owner, seen):
+                    return True
+            elif isinstance(value, type) and value.__module__ == func.__module__:
+                # 同模块的辅助类，如 cls.get_fonts() 写成 Helper.get_fonts()
+                for attr in vars(value).values():
+                    inner = getattr(attr, "__func__", attr)
+                    if isinstance(inner, types.FunctionType) and _reads_environment(inner, value, seen):
+                        return True
+    return False
+
+
+def snapshot_node(node_class):
+    """
+    为节点类生成快照，不能安全快照的节点返回 None
+    VALIDATE_INPUTS 会被 ComfyUI 通过参数签名检查，代理类无法还原，因此此类节点保持即时加载；
+    INPUT_TYPES 读取文件系统或 folder_paths 的节点（文件、字体、lora 下拉框）快照会过期，同样保持即时加载
+    """
+    if hasattr(node_class, "VALIDATE_INPUTS"):
+        return None
+    input_types_func = getattr(node_class.INPUT_TYPES, "__func__", node_class.INPUT_TYPES)
+    if not isinstance(input_types_func, types.FunctionType) or _reads_environment(input_types_func, node_class):
+        return None
+    try:
+        input_types = node_class.INPUT_TYPES()
+    except Exception:
+        return None
+
+    snapshot = {"INPUT_TYPES": input_types}
+    for attr in SNAPSHOT_ATTRS:
+        if hasattr(node_class, attr):
+            snapshot[attr] = getattr(node_class, attr)
+    if not _is_plain(snapshot):
+        return None
+    snapshot["HAS_IS_CHANGED"] = hasattr(node_class, "IS_CHANGED")
+    return snapshot
+
+
+def snapshot_module(module):
+    """生成模块的清单条目；任一节点无法快照时整个模块标记为即时加载"""
+    class_mappings = getattr(module, "NODE_CLASS_MAPPINGS", {})
+    nodes = {}
+    lazy = True
+    for name, node_class in class_mappings.items():
+        snapshot = snapshot_node(node_class)
+        if snapshot is None:
+            lazy = False
+            break
+        nodes[name] = snapshot
+    return {
+        "lazy": lazy,
+        "nodes": nodes if lazy else {},
+        "display_names": dict(getattr(module, "NODE_DISPLAY_NAME_MAPPINGS", {})),
+    }
+
+
+def _restore_input_types(input_types):
+    """JSON 会把输入规格元组变成列表，这里还原成 (类型, 选项) 元组"""
+    restored = {}
+    for section, inputs in input_types.items():
+        if isinstance(inputs, dict):
+            restored[section] = {name: tuple(spec) if isinstance(spec, list) else spec
+                                 for name, spec in inputs.items()}
+        else:
+            restored[section] = inputs
+    return restored
+
+
+def make_lazy_node(module_path, class_name, snapshot):
+    """
+    根据快照创建代理节点类
+    ComfyUI 读取的类属性全部来自快照，实例化时才导入真实模块并返回真实节点的实例
+    """
+    state = {"real_class": None}
+    input_types = _restore_input_types(snapshot["INPUT_TYPES"])
+
+    def resolve():
+        if state["real_class"] is None:
+            module = importlib.import_module(module_path)
+            state["real_class"] = module.NODE_CLASS_MAPPINGS[class_name]
+            print(f"✅ 按需加载节点: {class_name}")
+        return state["real_class"]
+
+    def __new__(cls, *args, **kwargs):
+        return resolve()(*args, **kwargs)
+
+    def INPUT_TYPES(cls):
+        # 真实模块已加载时使用实时结果（如字体、文件列表等动态选项）
+        if state["real_class"] is not None:
+            return state["real_class"].INPUT_TYPES()
+        return input_types
+
+    attrs = {
+        "__new__": __new__,
+        "__module__": module_path,
+        "INPUT_TYPES": classmethod(INPUT_TYPES),
+        "resolve": staticmethod(resolve),
+    }
+    for attr in SNAPSHOT_ATTRS:
+        if attr in snapshot:
+            value = snapshot[attr]
+            attrs[attr] = tuple(value) if attr in TUPLE_ATTRS and isinstance(value, list) else value
+
+    if snapshot.get("HAS_IS_CHANGED"):
+        def IS_CHANGED(cls, *args, **kwargs):
+            return resolve().IS_CHANGED(*args, **kwargs)
+        attrs["IS_CHANGED"] = classmethod(IS_CHANGED)
+
+    return type(class_name, (object,), attrs)
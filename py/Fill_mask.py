@@ -2,6 +2,9 @@ import torch
 import numpy as np
 from scipy.ndimage import binary_fill_holes
 import cv2
+from concurrent.futures import ThreadPoolExecutor
+
+from ._parallel import resolve_workers
 
 class PD_MaskFillHoles:
     """
@@ -31,6 +34,9 @@ class PD_MaskFillHoles:
                     "max": 10, 
                     "step": 1
                 }),  # 形态学操作迭代次数（仅opencv方法）
+                "verbose": ("BOOLEAN", {
+                    "default": False
+                }),  # 逐张打印调试信息
             }
         }
 
@@ -39,7 +45,7 @@ class PD_MaskFillHoles:
     FUNCTION = "fill_holes"  # 指定执行的方法名称
     CATEGORY = "PDuse/Mask"  # 定义节点的类别
 
-    def fill_holes(self, mask, fill_method="scipy", min_hole_size=0, iterations=1):
+    def fill_holes(self, mask, fill_method="scipy", min_hole_size=0, iterations=1, verbose=False):
         """
         填充mask图像中的空洞
         
@@ -48,6 +54,7 @@ class PD_MaskFillHoles:
             fill_method (str): 填充方法 ("scipy" 或 "opencv")
             min_hole_size (int): 最小空洞尺寸，小于此尺寸的空洞不会被填充
             iterations (int): 形态学操作迭代次数（仅opencv方法）
+            verbose (bool): 是否逐张打印调试信息
             
         返回：
             filled_mask (tensor): 填充空洞后的mask张量 [B, H, W]
@@ -58,22 +65,22 @@ class PD_MaskFillHoles:
         
         batch_size, height, width = mask.shape
         
-        # 处理每张mask
-        filled_masks = []
+        # 整批一次性转换为二值图像 (0 和 1)
+        # ComfyUI的mask: 1.0=前景(白色), 0.0=背景(黑色)
+        binary_masks = (mask > 0.5).to(torch.uint8).cpu().numpy()
+        
+        # 预分配输出，逐张写入
+        result = np.empty((batch_size, height, width), dtype=np.float32)
         
         for i in range(batch_size):
-            # 获取单张mask [H, W]
-            single_mask = mask[i].cpu().numpy()
+            binary_mask = binary_masks[i]
             
-            # 转换为二值图像 (0 和 1)
-            # ComfyUI的mask: 1.0=前景(白色), 0.0=背景(黑色)
-            binary_mask = (single_mask > 0.5).astype(np.uint8)
-            
-            print(f"🔍 处理第 {i+1} 张mask，原始前景像素: {np.sum(binary_mask)}")
+            if verbose:
+                print(f"🔍 处理第 {i+1} 张mask，原始前景像素: {np.sum(binary_mask)}")
             
             if fill_method == "scipy":
                 # 使用改进的方法，只填充真正的内部空洞（不连接边界的空洞）
-                filled_binary = self._fill_internal_holes_only(binary_mask)
+                filled_binary = self._fill_internal_holes_only(binary_mask, verbose)
                 
             elif fill_method == "opencv":
                 # 使用OpenCV方法，但仍然只填充内部空洞
@@ -84,57 +91,54 @@ class PD_MaskFillHoles:
                 preprocessed = cv2.morphologyEx(binary_mask, cv2.MORPH_CLOSE, kernel, iterations=iterations)
                 
                 # 然后使用改进的方法只填充内部空洞
-                filled_binary = self._fill_internal_holes_only(preprocessed)
+                filled_binary = self._fill_internal_holes_only(preprocessed, verbose)
             
             # 如果设置了最小空洞尺寸过滤
             if min_hole_size > 0:
-                # 计算新增的像素（填充的空洞）
-                newly_filled = filled_binary - binary_mask
-                
-                # 使用连通组件分析找到各个空洞
-                num_labels, labels = cv2.connectedComponents(newly_filled.astype(np.uint8))
-                
-                # 过滤掉小于最小尺寸的空洞
-                for label in range(1, num_labels):
-                    component_mask = (labels == label)
-                    component_size = np.sum(component_mask)
-                    
-                    if component_size < min_hole_size:
-                        # 如果空洞太小，恢复为原始状态
-                        filled_binary[component_mask] = binary_mask[component_mask]
-            
-            # 统计填充结果
-            original_foreground = np.sum(binary_mask)
-            filled_foreground = np.sum(filled_binary)
-            filled_pixels = filled_foreground - original_foreground
+                filled_binary = self._drop_small_holes(binary_mask, filled_binary, min_hole_size)
             
-            print(f"  ✅ 填充完成，新增前景像素: {filled_pixels}")
+            if verbose:
+                # 统计填充结果
+                filled_pixels = int(np.sum(filled_binary)) - int(np.sum(binary_mask))
+                print(f"  ✅ 填充完成，新增前景像素: {filled_pixels}")
             
             # 转换回浮点数格式 [H, W]
-            filled_mask_float = filled_binary.astype(np.float32)
-            
-            # 转换回张量格式
-            filled_tensor = torch.from_numpy(filled_mask_float)
-            filled_masks.append(filled_tensor)
+            result[i] = filled_binary
         
-        # 堆叠所有处理后的mask [B, H, W]
-        result_masks = torch.stack(filled_masks, dim=0)
+        # 转换回张量格式 [B, H, W]
+        result_masks = torch.from_numpy(result)
         
         # 统计整批的处理结果
-        original_total = torch.sum(mask > 0.5).item()
-        filled_total = torch.sum(result_masks > 0.5).item()
+        original_total = int(binary_masks.sum(dtype=np.int64))
+        filled_total = int(np.count_nonzero(result))
         total_filled = filled_total - original_total
         
         print(f"🎯 批处理完成: 共处理 {batch_size} 张mask，总计填充 {total_filled} 个像素")
         
         return (result_masks,)
 
-    def _fill_internal_holes_only(self, binary_mask):
+    def _drop_small_holes(self, binary_mask, filled_binary, min_hole_size):
+        """
+        小于 min_hole_size 的空洞恢复为原始状态
+        用连通组件的面积统计生成 标签 -> 是否保留 的查找表，一次索引得到结果
+        """
+        # 计算新增的像素（填充的空洞）
+        newly_filled = filled_binary - binary_mask
+        
+        # 使用连通组件分析找到各个空洞
+        num_labels, labels, stats, _ = cv2.connectedComponentsWithStats(newly_filled.astype(np.uint8))
+        
+        keep = stats[:, cv2.CC_STAT_AREA] >= min_hole_size
+        keep[0] = False  # 背景
+        return (binary_mask | keep[labels]).astype(np.uint8)
+
+    def _fill_internal_holes_only(self, binary_mask, verbose=True):
         """
         只填充真正的内部空洞，不处理连接到边界的开口区域
         
         参数：
             binary_mask (numpy.ndarray): 二值mask图像 [H, W]
+            verbose (bool): 是否打印空洞统计
             
         返回：
             filled_binary (numpy.ndarray): 只填充内部空洞的mask [H, W]
@@ -147,31 +151,11 @@ class PD_MaskFillHoles:
         
         # 反转mask：0变成1，1变成0
         # 这样背景变成前景，我们可以flood fill背景区域
-        inverted_mask = 1 - padded_mask
-        
-        # 从边界开始flood fill，标记所有连接到边界的背景区域
-        external_background = inverted_mask.copy()
-        
-        # 从四条边的所有边界点开始flood fill
-        # 上边界
-        for x in range(w + 2):
-            if external_background[0, x] == 1:
-                cv2.floodFill(external_background, None, (x, 0), 2)
-        
-        # 下边界
-        for x in range(w + 2):
-            if external_background[h + 1, x] == 1:
-                cv2.floodFill(external_background, None, (x, h + 1), 2)
+        external_background = 1 - padded_mask
         
-        # 左边界
-        for y in range(h + 2):
-            if external_background[y, 0] == 1:
-                cv2.floodFill(external_background, None, (0, y), 2)
-        
-        # 右边界
-        for y in range(h + 2):
-            if external_background[y, w + 1] == 1:
-                cv2.floodFill(external_background, None, (w + 1, y), 2)
+        # 填充的一圈全是背景，连成一个整体，从一个角点 flood fill 一次
+        # 就能标记所有连接到边界的背景区域
+        cv2.floodFill(external_background, None, (0, 0), 2)
         
         # 提取原始区域
         external_background = external_background[1:-1, 1:-1]
@@ -185,15 +169,15 @@ class PD_MaskFillHoles:
         internal_holes = (external_background == 1)
         
         # 创建填充结果：原始前景 + 内部空洞
-        filled_binary = binary_mask.copy()
-        filled_binary[internal_holes] = 1
+        filled_binary = binary_mask | internal_holes
         
         # 统计内部空洞
-        hole_count = np.sum(internal_holes)
-        if hole_count > 0:
-            print(f"    🕳️  识别到 {hole_count} 个内部空洞像素（不连接边界）")
-        else:
-            print(f"    ℹ️  未发现内部空洞")
+        if verbose:
+            hole_count = np.sum(internal_holes)
+            if hole_count > 0:
+                print(f"    🕳️  识别到 {hole_count} 个内部空洞像素（不连接边界）")
+            else:
+                print(f"    ℹ️  未发现内部空洞")
         
         return filled_binary.astype(np.uint8)
 
@@ -222,6 +206,12 @@ class PD_MaskRemoveSmallObjects:
                     "max": 2, 
                     "step": 1
                 }),  # 连通性 (1=4连通, 2=8连通)
+                "workers": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 256,
+                    "step": 1
+                }),  # 并行线程数（0=按CPU核数自动选择）
             }
         }
 
@@ -230,7 +220,7 @@ class PD_MaskRemoveSmallObjects:
     FUNCTION = "remove_small_objects"  # 指定执行的方法名称
     CATEGORY = "PDuse/Mask"  # 定义节点的类别
 
-    def remove_small_objects(self, mask, min_size=100, connectivity=2):
+    def remove_small_objects(self, mask, min_size=100, connectivity=2, workers=0):
         """
         移除mask图像中的小对象
         
@@ -238,6 +228,7 @@ class PD_MaskRemoveSmallObjects:
             mask (tensor): 输入mask张量 [B, H, W]
             min_size (int): 最小对象尺寸，小于此尺寸的对象将被移除
             connectivity (int): 连通性 (1=4连通, 2=8连通)
+            workers (int): 并行线程数，0 为按 CPU 核数自动选择
             
         返回：
             cleaned_mask (tensor): 清理后的mask张量 [B, H, W]
@@ -248,50 +239,40 @@ class PD_MaskRemoveSmallObjects:
         
         batch_size, height, width = mask.shape
         
-        # 处理每张mask
-        cleaned_masks = []
+        # 整批一次性转换为二值图像
+        binary_masks = (mask > 0.5).to(torch.uint8).cpu().numpy()
+        connectivity_cv = 4 if connectivity == 1 else 8
         
-        for i in range(batch_size):
-            # 获取单张mask [H, W]
-            single_mask = mask[i].cpu().numpy()
-            
-            # 转换为二值图像
-            binary_mask = (single_mask > 0.5).astype(np.uint8)
-            
+        # 预分配输出，各线程写入自己的那一帧
+        result = np.empty((batch_size, height, width), dtype=np.float32)
+        
+        def clean(i):
             # 使用连通组件分析
-            connectivity_cv = 4 if connectivity == 1 else 8
-            num_labels, labels = cv2.connectedComponents(binary_mask, connectivity=connectivity_cv)
-            
-            # 创建清理后的mask
-            cleaned_binary = np.zeros_like(binary_mask)
+            num_labels, labels, stats, _ = cv2.connectedComponentsWithStats(
+                binary_masks[i], connectivity=connectivity_cv
+            )
             
-            removed_objects = 0
-            kept_objects = 0
-            
-            # 检查每个连通组件
-            for label in range(1, num_labels):  # 跳过背景标签0
-                component_mask = (labels == label)
-                component_size = np.sum(component_mask)
-                
-                if component_size >= min_size:
-                    # 保留足够大的对象
-                    cleaned_binary[component_mask] = 1
-                    kept_objects += 1
-                else:
-                    # 移除太小的对象
-                    removed_objects += 1
+            # 标签 -> 是否保留 的查找表，一次索引得到清理后的mask
+            keep = stats[:, cv2.CC_STAT_AREA] >= min_size
+            keep[0] = False  # 跳过背景标签0
+            result[i] = keep[labels]
             
+            kept_objects = int(np.count_nonzero(keep))
+            return kept_objects, num_labels - 1 - kept_objects
+        
+        # OpenCV 计算时会释放 GIL，多帧在线程池中并行处理
+        workers = min(resolve_workers(workers), batch_size)
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pd_mask") as pool:
+                counts = list(pool.map(clean, range(batch_size)))
+        else:
+            counts = [clean(i) for i in range(batch_size)]
+        
+        for i, (kept_objects, removed_objects) in enumerate(counts):
             print(f"🧹 第 {i+1} 张mask: 保留 {kept_objects} 个对象，移除 {removed_objects} 个小对象")
-            
-            # 转换回浮点数格式
-            cleaned_mask_float = cleaned_binary.astype(np.float32)
-            
-            # 转换回张量格式
-            cleaned_tensor = torch.from_numpy(cleaned_mask_float)
-            cleaned_masks.append(cleaned_tensor)
         
-        # 堆叠所有处理后的mask
-        result_masks = torch.stack(cleaned_masks, dim=0)
+        # 转换回张量格式
+        result_masks = torch.from_numpy(result)
         
         print(f"🎯 批处理完成: 共处理 {batch_size} 张mask")
         
@@ -1,7 +1,7 @@
 import os
 import torch
-import numpy as np
-from PIL import Image, ImageOps
+
+from ._image_loading import STORAGE_DTYPES, constant_mask, load_image_array, pixels_to_tensor
 
 class PD_LoadImagesPath:
     @classmethod
@@ -20,6 +20,22 @@ class PD_LoadImagesPath:
                     "step": 1,
                     "label": "限制读取数量(0为不限)"
                 }),
+            },
+            "optional": {
+                "use_decode_cache": ("BOOLEAN", {
+                    "default": False,
+                    "label": "使用解码缓存"
+                }),
+                "pixel_storage": (STORAGE_DTYPES, {
+                    "default": "float32"
+                }),
+                "max_side": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 16384,
+                    "step": 8,
+                    "label": "最长边上限(0为原图)"
+                }),
             }
         }
 
@@ -32,7 +48,7 @@ class PD_LoadImagesPath:
     # 配置：image_list 和 mask_list 均为列表(True)
     OUTPUT_IS_LIST = (True, True, False, False)
 
-    def load_images(self, directory_path, limit_count):
+    def load_images(self, directory_path, limit_count, use_decode_cache=False, pixel_storage="float32", max_side=0):
         image_list = []
         mask_list = []
         names = []
@@ -58,22 +74,22 @@ class PD_LoadImagesPath:
         for filename in files:
             file_path = os.path.join(directory_path, filename)
             try:
-                img = Image.open(file_path)
-                img = ImageOps.exif_transpose(img) # 处理旋转
+                # uint8 数组 [H, W, 3] 或带 alpha 的 [H, W, 4]，已处理旋转
+                # max_side > 0 时 JPEG 直接缩小解码，再缩放到最长边 max_side
+                img_array = load_image_array(file_path, use_decode_cache, max_side)
                 
                 # --- 处理 Mask ---
-                if 'A' in img.getbands():
+                if img_array.shape[2] == 4:
                     # 如果有 Alpha 通道，提取它
-                    mask = np.array(img.getchannel('A')).astype(np.float32) / 255.0
-                    mask = torch.from_numpy(mask)
+                    mask = pixels_to_tensor(img_array[..., 3], pixel_storage)
                 else:
                     # 如果没有 Alpha 通道，创建一个全白（不透明）的 Mask
-                    mask = torch.ones((img.height, img.width), dtype=torch.float32)
+                    height, width = img_array.shape[:2]
+                    mask = constant_mask(height, width, 1.0, pixel_storage)
                 
                 # --- 处理 Image ---
-                img = img.convert("RGB")
-                img_np = np.array(img).astype(np.float32) / 255.0
-                img_tensor = torch.from_numpy(img_np)[None,]
+                # float32 为默认；float16 以半精度保存，值仍为 0-1
+                img_tensor = pixels_to_tensor(img_array[..., :3], pixel_storage)[None,]
                 
                 image_list.append(img_tensor)
                 mask_list.append(mask[None,]) # Mask 格式通常为 (1, H, W)
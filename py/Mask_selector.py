@@ -1,6 +1,8 @@
+import json
+
 import torch
-import numpy as np
-import cv2
+
+from ._mask_regions import LABEL, connected_regions, crop_box, extract_region, region_info, region_mask, region_order
 
 class PD_MaskSelector:
     @classmethod
@@ -14,104 +16,93 @@ class PD_MaskSelector:
                 "min_area": ("INT", {"default": 100, "min": 0, "max": 100000, "step": 10}),
                 "padding": ("INT", {"default": 10, "min": 0, "max": 200, "step": 1}),
                 "output_mode": (["crop", "full_canvas"],),
+            },
+            "optional": {
+                # 开启后 region_images/region_masks 输出全部区域，一次标记代替多个节点分别选取
+                "all_regions": ("BOOLEAN", {"default": False, "label_on": "全部区域", "label_off": "仅选中"}),
+                "max_regions": ("INT", {"default": 0, "min": 0, "max": 10000, "step": 1}),  # 全部区域输出的最多个数，0 为不限制，不影响 select
             }
         }
 
-    RETURN_TYPES = ("IMAGE", "MASK")
-    RETURN_NAMES = ("image", "mask")
+    RETURN_TYPES = ("IMAGE", "MASK", "IMAGE", "MASK", "STRING")
+    RETURN_NAMES = ("image", "mask", "region_images", "region_masks", "bboxes")
+    OUTPUT_IS_LIST = (False, False, True, True, False)
     FUNCTION = "select_region"
     CATEGORY = "PDuse/Mask"
 
-    def _connected_regions(self, mask_uint8, min_area=100):
-        num_labels, labels, stats, centroids = cv2.connectedComponentsWithStats(
-            mask_uint8, connectivity=8
-        )
-        regions = []
-        for i in range(1, num_labels):  # 跳过背景
-            area = int(stats[i, cv2.CC_STAT_AREA])
-            if area >= min_area:
-                x = int(stats[i, cv2.CC_STAT_LEFT])
-                y = int(stats[i, cv2.CC_STAT_TOP])
-                w = int(stats[i, cv2.CC_STAT_WIDTH])
-                h = int(stats[i, cv2.CC_STAT_HEIGHT])
-                cx = float(centroids[i][0])
-                cy = float(centroids[i][1])
-                regions.append({
-                    "label": i, "area": area,
-                    "x": x, "y": y, "w": w, "h": h,
-                    "cx": cx, "cy": cy
-                })
-        return regions, labels
-
-    def _pad_to(self, arr, target_h, target_w, is_image=True):
-        if is_image:
-            H, W, C = arr.shape
-            out = np.zeros((target_h, target_w, C), dtype=arr.dtype)
-            out[:H, :W, :] = arr
-        else:
-            H, W = arr.shape
-            out = np.zeros((target_h, target_w), dtype=arr.dtype)
-            out[:H, :W] = arr
-        return out
-
     def select_region(self, image, mask, select="mask1", sort_by="left_to_right",
-                      min_area=100, padding=10, output_mode="crop"):
+                      min_area=100, padding=10, output_mode="crop", all_regions=False, max_regions=0):
         bsz = image.shape[0]
+        H, W = mask.shape[-2:]
         select_idx = {"mask1": 0, "mask2": 1, "mask3": 2, "mask4": 3}[select]
+        full_canvas = output_mode == "full_canvas"
 
-        crops_img = []
-        crops_msk = []
+        # 整个批次一次性二值化，只有连通域标记逐帧调用 OpenCV
+        image = image.cpu()
+        binary = ((mask > 0.5).to(torch.uint8) * 255).cpu().numpy()
 
+        # 每帧只标记一次，选区和多区域输出共用同一份结果
+        frames = []
         for b in range(bsz):
-            img = image[b].cpu().numpy()
-            msk = mask[b].cpu().numpy()
-
-            H, W = msk.shape[:2]
-            mask_uint8 = (msk > 0.5).astype(np.uint8) * 255
-
-            regions, labels = self._connected_regions(mask_uint8, min_area=min_area)
-
-            if sort_by == "left_to_right":
-                regions.sort(key=lambda r: r["cx"])
-            else:
-                regions.sort(key=lambda r: r["area"], reverse=True)
+            regions, cx, labels = connected_regions(binary[b], min_area=min_area)
+            regions = regions[region_order(regions, cx, sort_by)]
+            frames.append((regions, labels))
 
+        # 每帧选中区域: (标签图, 标签, 裁切框)，未选中为 None
+        selected = []
+        for regions, labels in frames:
             if select_idx >= len(regions):
-                if output_mode == "full_canvas":
-                    sel_img = np.zeros_like(img, dtype=img.dtype)
-                    sel_msk = np.zeros((H, W), dtype=np.float32)
-                else:
-                    sel_img = np.zeros((1, 1, img.shape[2]), dtype=img.dtype)
-                    sel_msk = np.zeros((1, 1), dtype=np.float32)
+                selected.append(None)
+                continue
+            region = regions[select_idx]
+            box = crop_box(region, 0 if full_canvas else padding, H, W)
+            selected.append((labels, int(region[LABEL]), box))
+
+        # 预分配输出，未选中的帧保持全零
+        if full_canvas:
+            out_h, out_w = H, W
+        else:
+            out_h = max([s[2][3] - s[2][1] for s in selected if s is not None], default=1)
+            out_w = max([s[2][2] - s[2][0] for s in selected if s is not None], default=1)
+        out_img = torch.zeros((bsz, out_h, out_w, image.shape[-1]), dtype=torch.float32)
+        out_msk = torch.zeros((bsz, out_h, out_w), dtype=torch.float32)
+
+        for b, sel in enumerate(selected):
+            if sel is None:
+                continue
+            labels, label, (x1, y1, x2, y2) = sel
+            sel_mask = region_mask(labels, label, (x1, y1, x2, y2))
+            if full_canvas:
+                out_msk[b, y1:y2, x1:x2] = sel_mask
+                out_img[b, y1:y2, x1:x2] = image[b, y1:y2, x1:x2] * sel_mask[..., None]
+            else:
+                out_msk[b, :y2 - y1, :x2 - x1] = sel_mask
+                out_img[b, :y2 - y1, :x2 - x1] = image[b, y1:y2, x1:x2]
+
+        # 列表输出：全部区域，或每帧选中的区域，各自保持原始尺寸
+        region_images = []
+        region_masks = []
+        bboxes = []
+        for b, (regions, labels) in enumerate(frames):
+            if all_regions:
+                # max_regions 只截断列表输出，select 仍从完整排序中选取
+                indices = range(len(regions) if max_regions <= 0 else min(len(regions), max_regions))
             else:
-                region = regions[select_idx]
-                single_mask = (labels == region["label"]).astype(np.float32)
-
-                if output_mode == "full_canvas":
-                    sel_msk = single_mask
-                    sel_img = img * sel_msk[..., None]
-                else:
-                    x, y, w, h = region["x"], region["y"], region["w"], region["h"]
-                    x1 = max(0, x - padding)
-                    y1 = max(0, y - padding)
-                    x2 = min(W, x + w + padding)
-                    y2 = min(H, y + h + padding)
-                    sel_img = img[y1:y2, x1:x2, :]
-                    sel_msk = single_mask[y1:y2, x1:x2]
-
-            crops_img.append(sel_img)
-            crops_msk.append(sel_msk)
-
-        if output_mode == "crop":
-            max_h = max(ci.shape[0] for ci in crops_img)
-            max_w = max(ci.shape[1] for ci in crops_img)
-            crops_img = [self._pad_to(ci, max_h, max_w, is_image=True) for ci in crops_img]
-            crops_msk = [self._pad_to(cm, max_h, max_w, is_image=False) for cm in crops_msk]
-
-        out_img = torch.from_numpy(np.stack(crops_img, axis=0)).float()
-        out_msk = torch.from_numpy(np.stack(crops_msk, axis=0)).float()
-
-        return (out_img, out_msk)
+                indices = [select_idx] if select_idx < len(regions) else []
+            for i in indices:
+                region = regions[i]
+                box = crop_box(region, 0 if full_canvas else padding, H, W)
+                region_img, region_msk = extract_region(image[b], labels, int(region[LABEL]), box, full_canvas)
+                region_images.append(region_img.unsqueeze(0))
+                region_masks.append(region_msk.unsqueeze(0))
+                bboxes.append(region_info(b, i, region, box))
+
+        # 没有任何区域时输出一个空白，与单选超出范围时一致
+        if not region_images:
+            region_images.append(torch.zeros((1, 1, 1, image.shape[-1]), dtype=torch.float32))
+            region_masks.append(torch.zeros((1, 1, 1), dtype=torch.float32))
+
+        return (out_img, out_msk, region_images, region_masks, json.dumps(bboxes, ensure_ascii=False))
 
 
 NODE_CLASS_MAPPINGS = {
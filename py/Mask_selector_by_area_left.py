@@ -1,6 +1,12 @@
+import json
+
 import torch
-import numpy as np
-import cv2
+
+from ._mask_regions import LABEL, connected_regions, crop_box, extract_region, region_info, region_mask, region_order
+
+# select 的候选区域数：面积最大的 4 个，对应 mask1-mask4
+SELECT_CANDIDATES = 4
+
 
 class PD_MaskSelectorByAreaLeft:
     @classmethod
@@ -11,117 +17,101 @@ class PD_MaskSelectorByAreaLeft:
                 "mask": ("MASK",),
                 "select": (["mask1", "mask2", "mask3", "mask4"],),
                 "padding": ("INT", {"default": 10, "min": 0, "max": 200, "step": 1}),
+            },
+            "optional": {
+                # 开启后 region_images/region_masks 输出全部候选区域，一次标记代替多个节点分别选取
+                "all_regions": ("BOOLEAN", {"default": False, "label_on": "全部区域", "label_off": "仅选中"}),
+                # 全部区域输出取面积最大的前 N 个，0 为不限制；select 始终在面积最大的 4 个中选取
+                "max_regions": ("INT", {"default": 4, "min": 0, "max": 10000, "step": 1}),
             }
         }
 
-    RETURN_TYPES = ("IMAGE", "MASK", "INT", "INT")
-    RETURN_NAMES = ("image", "mask", "x", "y")
+    RETURN_TYPES = ("IMAGE", "MASK", "INT", "INT", "IMAGE", "MASK", "STRING")
+    RETURN_NAMES = ("image", "mask", "x", "y", "region_images", "region_masks", "bboxes")
+    OUTPUT_IS_LIST = (False, False, False, False, True, True, False)
     FUNCTION = "select_region"
     CATEGORY = "PDuse/Mask"
 
-    def _connected_regions(self, mask_uint8):
-        """检测所有连通区域"""
-        num_labels, labels, stats, centroids = cv2.connectedComponentsWithStats(
-            mask_uint8, connectivity=8
-        )
-        regions = []
-        for i in range(1, num_labels):  # 跳过背景
-            area = int(stats[i, cv2.CC_STAT_AREA])
-            x = int(stats[i, cv2.CC_STAT_LEFT])
-            y = int(stats[i, cv2.CC_STAT_TOP])
-            w = int(stats[i, cv2.CC_STAT_WIDTH])
-            h = int(stats[i, cv2.CC_STAT_HEIGHT])
-            cx = float(centroids[i][0])
-            cy = float(centroids[i][1])
-            regions.append({
-                "label": i, "area": area,
-                "x": x, "y": y, "w": w, "h": h,
-                "cx": cx, "cy": cy
-            })
-        return regions, labels
-
-    def _pad_to(self, arr, target_h, target_w, is_image=True):
-        """填充到目标尺寸"""
-        if is_image:
-            H, W, C = arr.shape
-            out = np.zeros((target_h, target_w, C), dtype=arr.dtype)
-            out[:H, :W, :] = arr
-        else:
-            H, W = arr.shape
-            out = np.zeros((target_h, target_w), dtype=arr.dtype)
-            out[:H, :W] = arr
-        return out
-
-    def select_region(self, image, mask, select="mask1", padding=10):
+    def select_region(self, image, mask, select="mask1", padding=10, all_regions=False, max_regions=4):
         bsz = image.shape[0]
+        H, W = mask.shape[-2:]
         select_idx = {"mask1": 0, "mask2": 1, "mask3": 2, "mask4": 3}[select]
 
-        crops_img = []
-        crops_msk = []
-        x_coords = []
-        y_coords = []
+        # 整个批次一次性二值化，只有连通域标记逐帧调用 OpenCV
+        image = image.cpu()
+        binary = ((mask > 0.5).to(torch.uint8) * 255).cpu().numpy()
 
+        frames = []
         for b in range(bsz):
-            img = image[b].cpu().numpy()
-            msk = mask[b].cpu().numpy()
-
-            H, W = msk.shape[:2]
-            mask_uint8 = (msk > 0.5).astype(np.uint8) * 255
-
             # 检测所有连通区域
-            regions, labels = self._connected_regions(mask_uint8)
-
-            # 步骤1: 按面积从大到小排序，取前4个
-            regions.sort(key=lambda r: r["area"], reverse=True)
-            top_regions = regions[:4]  # 取最大的4个区域
-
-            # 步骤2: 对这4个大区域按从左到右排序
-            top_regions.sort(key=lambda r: r["cx"])
-
-            # 步骤3: 根据 select 参数选择
-            if select_idx >= len(top_regions):
-                # 如果选择的索引超出范围，返回空白
-                sel_img = np.zeros((1, 1, img.shape[2]), dtype=img.dtype)
-                sel_msk = np.zeros((1, 1), dtype=np.float32)
-                crop_x = 0
-                crop_y = 0
+            regions, cx, labels = connected_regions(binary[b])
+
+            # 步骤1: 按面积从大到小排序
+            by_area = region_order(regions, cx, "area_desc")
+
+            # 步骤2: 选区候选为最大的 4 个，全部区域输出为最大的 max_regions 个，各自按从左到右排序
+            top = by_area[:SELECT_CANDIDATES]
+            listed = by_area[:max_regions] if max_regions > 0 else by_area
+            top = top[region_order(regions[top], cx[top], "left_to_right")]
+            listed = listed[region_order(regions[listed], cx[listed], "left_to_right")]
+            frames.append((regions[top], regions[listed], labels))
+
+        # 步骤3: 根据 select 参数选择，记录每帧的裁切框
+        selected = []
+        for regions, _, labels in frames:
+            if select_idx >= len(regions):
+                selected.append(None)
+            else:
+                region = regions[select_idx]
+                selected.append((labels, int(region[LABEL]), crop_box(region, padding, H, W)))
+
+        # 预分配统一尺寸的输出，超出范围的帧为空白
+        out_h = max([s[2][3] - s[2][1] for s in selected if s is not None], default=1)
+        out_w = max([s[2][2] - s[2][0] for s in selected if s is not None], default=1)
+        out_img = torch.zeros((bsz, out_h, out_w, image.shape[-1]), dtype=torch.float32)
+        out_msk = torch.zeros((bsz, out_h, out_w), dtype=torch.float32)
+        x_coords = []
+        y_coords = []
+
+        for b, sel in enumerate(selected):
+            if sel is None:
+                x_coords.append(0)
+                y_coords.append(0)
+                continue
+            labels, label, (x1, y1, x2, y2) = sel
+            out_msk[b, :y2 - y1, :x2 - x1] = region_mask(labels, label, (x1, y1, x2, y2))
+            out_img[b, :y2 - y1, :x2 - x1] = image[b, y1:y2, x1:x2]
+
+            # 记录裁切位置
+            x_coords.append(x1)
+            y_coords.append(y1)
+
+        # 列表输出：全部候选区域，或每帧选中的区域，各自保持原始尺寸
+        region_images = []
+        region_masks = []
+        bboxes = []
+        for b, (top, listed, labels) in enumerate(frames):
+            if all_regions:
+                chosen = list(enumerate(listed))
             else:
-                region = top_regions[select_idx]
-                single_mask = (labels == region["label"]).astype(np.float32)
-
-                # 裁切模式（固定）
-                x, y, w, h = region["x"], region["y"], region["w"], region["h"]
-                x1 = max(0, x - padding)
-                y1 = max(0, y - padding)
-                x2 = min(W, x + w + padding)
-                y2 = min(H, y + h + padding)
-                
-                sel_img = img[y1:y2, x1:x2, :]
-                sel_msk = single_mask[y1:y2, x1:x2]
-                
-                # 记录裁切位置
-                crop_x = x1
-                crop_y = y1
-
-            crops_img.append(sel_img)
-            crops_msk.append(sel_msk)
-            x_coords.append(crop_x)
-            y_coords.append(crop_y)
-
-        # 填充到统一尺寸
-        max_h = max(ci.shape[0] for ci in crops_img)
-        max_w = max(ci.shape[1] for ci in crops_img)
-        crops_img = [self._pad_to(ci, max_h, max_w, is_image=True) for ci in crops_img]
-        crops_msk = [self._pad_to(cm, max_h, max_w, is_image=False) for cm in crops_msk]
-
-        out_img = torch.from_numpy(np.stack(crops_img, axis=0)).float()
-        out_msk = torch.from_numpy(np.stack(crops_msk, axis=0)).float()
-        
+                chosen = [(select_idx, top[select_idx])] if select_idx < len(top) else []
+            for i, region in chosen:
+                box = crop_box(region, padding, H, W)
+                region_img, region_msk = extract_region(image[b], labels, int(region[LABEL]), box)
+                region_images.append(region_img.unsqueeze(0))
+                region_masks.append(region_msk.unsqueeze(0))
+                bboxes.append(region_info(b, i, region, box))
+
+        # 没有任何区域时输出一个空白，与单选超出范围时一致
+        if not region_images:
+            region_images.append(torch.zeros((1, 1, 1, image.shape[-1]), dtype=torch.float32))
+            region_masks.append(torch.zeros((1, 1, 1), dtype=torch.float32))
+
         # 输出第一个batch的坐标（如果有多个batch，可以根据需要调整）
         out_x = x_coords[0]
         out_y = y_coords[0]
 
-        return (out_img, out_msk, out_x, out_y)
+        return (out_img, out_msk, out_x, out_y, region_images, region_masks, json.dumps(bboxes, ensure_ascii=False))
 
 
 NODE_CLASS_MAPPINGS = {
@@ -1,3 +1,5 @@
+import bisect
+
 import cv2
 import numpy as np
 import torch
@@ -24,6 +26,54 @@ class PD_Maskfenkai:
     FUNCTION = "split_objects"
     CATEGORY = "Custom/PD"
 
+    @staticmethod
+    def _order_by_rows(components, row_tolerance):
+        """
+        Group components into rows and return them top-to-bottom, left-to-right.
+
+        Each component joins the earliest-created row whose running average
+        center is within row_tolerance. Rows are also kept in a list sorted by
+        average center, so only rows near the component are checked instead
+        of every row, and averages come from running sums.
+        """
+        # First sort by top-left, then regroup by row tolerance so the order
+        # stays stable for 2x3 / multi-row sticker sheets.
+        components = sorted(components, key=lambda c: (c["y"], c["x"]))
+
+        rows = []
+        by_center = []  # (avg_cy, row index), sorted
+        for comp in components:
+            cy = comp["y"] + comp["h"] * 0.5
+
+            # Candidate window is widened by 1px; the exact tolerance test
+            # below decides, so rounding never changes which row is chosen.
+            lo = bisect.bisect_left(by_center, (cy - row_tolerance - 1, -1))
+            hi = bisect.bisect_right(by_center, (cy + row_tolerance + 1, len(rows)))
+            candidates = [
+                index for avg_cy, index in by_center[lo:hi]
+                if abs(cy - avg_cy) <= row_tolerance
+            ]
+
+            if not candidates:
+                bisect.insort(by_center, (cy, len(rows)))
+                rows.append({"avg_cy": cy, "sum_cy": cy, "items": [comp]})
+                continue
+
+            index = min(candidates)
+            row = rows[index]
+            del by_center[bisect.bisect_left(by_center, (row["avg_cy"], index))]
+            row["items"].append(comp)
+            row["sum_cy"] += cy
+            row["avg_cy"] = row["sum_cy"] / len(row["items"])
+            bisect.insort(by_center, (row["avg_cy"], index))
+
+        rows.sort(key=lambda row: row["avg_cy"])
+        ordered_components = []
+        for row in rows:
+            row["items"].sort(key=lambda c: c["x"])
+            ordered_components.extend(row["items"])
+        return ordered_components
+
     def split_objects(
         self,
         image,
@@ -99,32 +149,7 @@ class PD_Maskfenkai:
                 }
             )
 
-        # First sort by top-left, then regroup by row tolerance so the order
-        # stays stable for 2x3 / multi-row sticker sheets.
-        components.sort(key=lambda c: (c["y"], c["x"]))
-
-        rows = []
-        for comp in components:
-            placed = False
-            cy = comp["y"] + comp["h"] * 0.5
-
-            for row in rows:
-                if abs(cy - row["avg_cy"]) <= row_tolerance:
-                    row["items"].append(comp)
-                    row["avg_cy"] = sum(
-                        item["y"] + item["h"] * 0.5 for item in row["items"]
-                    ) / len(row["items"])
-                    placed = True
-                    break
-
-            if not placed:
-                rows.append({"avg_cy": cy, "items": [comp]})
-
-        rows.sort(key=lambda row: row["avg_cy"])
-        ordered_components = []
-        for row in rows:
-            row["items"].sort(key=lambda c: c["x"])
-            ordered_components.extend(row["items"])
+        ordered_components = self._order_by_rows(components, row_tolerance)
 
         out_images = []
         out_masks = []
@@ -4,16 +4,17 @@ PD图像保存节点
 """
 
 from PIL import Image, ImageOps, ImageSequence
-from PIL.PngImagePlugin import PngInfo
 import os
 import numpy as np
-import json
 import re
 from comfy.cli_args import args
 import folder_paths
 from datetime import datetime
 import time
 
+from ._file_counter import allocate, discard_placeholder
+from ._save_writer import SAVE_PROFILE_NAMES, get_writer, png_metadata, save_options
+
 class PD_imagesave_path:
     """
     PD图像保存路径节点
@@ -25,7 +26,6 @@ class PD_imagesave_path:
         self.output_dir = folder_paths.get_output_directory()  # 获取默认输出目录
         self.type = "output"  # 输出类型标识
         self.prefix_append = ""  # 文件名前缀追加内容
-        self.compress_level = 4  # PNG压缩级别 (0-9, 0为无压缩, 9为最高压缩)
 
     @classmethod
     def INPUT_TYPES(s):
@@ -42,9 +42,15 @@ class PD_imagesave_path:
                      "format": (["png", "jpg"], {"default": "png"}),  # 图像格式选择
                      "numberfront": ("BOOLEAN", {"default": True}),  # 数字位置：True=前面，False=后面
                      "separator": ("STRING", {"default": "_"}),  # 分割符，默认为下划线
-                     "show_preview": ("BOOLEAN", {"default": True}),  # 是否在前端显示预览图
+                     "show_preview": ("BOOLEAN", {"default": True}),  # 是否在前端显示预览图（异步保存时不显示，文件可能还没写完）
                      "refresh_each_run": ("BOOLEAN", {"default": False}),
                      },
+                "optional":
+                    {"async_save": ("BOOLEAN", {"default": False}),  # 异步保存：编码和写盘交给后台线程，节点立即返回，不显示预览
+                     "save_workers": ("INT", {"default": 0, "min": 0, "max": 64}),  # 后台写入线程数，0=按CPU核数
+                     "compress_metadata": ("BOOLEAN", {"default": False}),  # PNG中的prompt/工作流以zlib压缩存储(zTXt)
+                     "save_profile": (SAVE_PROFILE_NAMES, {"default": "balanced"}),  # 编码档位：fast速度优先，balanced折中，archival归档(PNG最小,JPEG色度完整更大)
+                     },
                 "hidden": {"prompt": "PROMPT", "extra_pnginfo": "EXTRA_PNGINFO"},  # 隐藏的提示信息和额外PNG信息
                 }
 
@@ -59,9 +65,14 @@ class PD_imagesave_path:
     CATEGORY = "PD/Image"  # 节点分类
 
     def save_images(self, images, filename_prefix="R", prompt=None, extra_pnginfo=None, 
-                   custom_output_dir="", format="png", numberfront=True, separator="_", show_preview=True, refresh_each_run=False):
+                   custom_output_dir="", format="png", numberfront=True, separator="_", show_preview=True, refresh_each_run=False,
+                   async_save=False, save_workers=0, compress_metadata=False,
+                   save_profile="balanced"):
         """
         保存图像主方法
+        async_save=True 时文件名立即分配，图像交给后台线程写入，saved_count 为已提交的数量；
+        用 PD:Wait Async Saves 节点等待写入完成并查看失败的文件。
+        异步保存时不返回预览：节点返回时文件可能还是空的占位文件，前端加载会得到空图
         """
         try:
             # 判断是否有自定义保存路径
@@ -82,16 +93,18 @@ class PD_imagesave_path:
                 # 如果创建目录失败，可能因为权限问题，但这通常会让后续保存步骤报错
             
             # 调用私有方法保存图像到自定义目录，获取保存结果
+            writer = get_writer(save_workers) if async_save else None
             results = self._save_images_to_dir(images, filename_prefix, prompt, extra_pnginfo, 
-                                   custom_output_dir, format, numberfront, separator)
+                                   custom_output_dir, format, numberfront, separator, writer,
+                                   compress_metadata, save_profile)
 
             saved_count = len(results)
             success = saved_count > 0
             
             # 根据show_preview参数决定返回值
             if show_preview:
-                # 返回UI预览信息，前端会显示图像预览
-                return {"ui": {"images": results}, "result": (success, saved_count)}
+                # 返回UI预览信息，前端会显示图像预览；异步保存时文件尚未写完，不返回预览
+                return {"ui": {"images": [] if async_save else results}, "result": (success, saved_count)}
             else:
                 # 返回空UI字典，确保节点执行完成但不显示预览图
                 return (success, saved_count)
@@ -103,19 +116,22 @@ class PD_imagesave_path:
             return (False, 0)
 
     def _save_images_to_dir(self, images, filename_prefix, prompt, extra_pnginfo, 
-                           output_dir, format, numberfront, separator):
+                           output_dir, format, numberfront, separator, writer=None, compress_metadata=False,
+                           save_profile="balanced"):
         """
         私有方法：将图像保存到指定目录
+        writer 不为空时提交到后台写入线程池，不等待写盘完成
         """
         results = list()
         
         # 根据格式确定文件扩展名
         extension = f".{format.lower()}"
         
-        # 获取下一个可用的计数器值（从1到100）
-        counter = self._get_next_counter(output_dir, filename_prefix, extension, 
-                                       numberfront, separator)
-            
+        # 如果没有禁用元数据且为PNG格式，则添加元数据信息（整批只序列化一次，各帧共用）
+        metadata = None
+        if not args.disable_metadata and format.lower() == "png":
+            metadata = png_metadata(prompt, extra_pnginfo, compress_metadata)
+        
         # 遍历图像数组，逐个保存
         for (batch_number, image) in enumerate(images):
             # 将张量转换为numpy数组，并缩放到0-255范围
@@ -137,40 +153,26 @@ class PD_imagesave_path:
                     i = i[:, :, :3]
                 img = Image.fromarray(np.clip(i, 0, 255).astype(np.uint8), 'RGB')
             
-            metadata = None
+            # 根据numberfront分配文件名（数字在前：1_R.ext，在后：R_1.ext）
+            file = self._allocate_filename(output_dir, filename_prefix, extension, numberfront, separator)
             
-            # 如果没有禁用元数据且为PNG格式，则添加元数据信息
-            if not args.disable_metadata and format.lower() == "png":
-                metadata = PngInfo()  # 创建PNG信息对象
-                # 添加提示词信息到元数据
-                if prompt is not None:
-                    metadata.add_text("prompt", json.dumps(prompt))
-                # 添加额外PNG信息到元数据
-                if extra_pnginfo is not None:
-                    for x in extra_pnginfo:
-                        metadata.add_text(x, json.dumps(extra_pnginfo[x]))
-            
-            # 根据numberfront生成文件名
-            if numberfront:
-                # 数字在前面：1_R.ext
-                file = f"{counter}{separator}{filename_prefix}{extension}"
-            else:
-                # 数字在后面：R_1.ext
-                file = f"{filename_prefix}{separator}{counter}{extension}"
-            
-            # 根据格式保存图像
-            if format.lower() == "png":
-                # PNG格式：保存为RGBA，包含元数据和指定的压缩级别
-                img.save(os.path.join(output_dir, file), 
-                        pnginfo=metadata, 
-                        compress_level=self.compress_level,
-                        format='PNG')
-            else:  # JPG格式
-                # JPG格式：保存为RGB，设置质量
-                img.save(os.path.join(output_dir, file), 
-                        format='JPEG', 
-                        quality=95,  # JPG质量设置
-                        optimize=True)
+            # 分配之后任何一步出错都删除空占位文件，编号可以重新使用
+            try:
+                # 根据格式确定保存参数
+                if format.lower() == "png":
+                    # PNG格式：保存为RGBA，包含元数据，压缩级别由保存档位决定
+                    save_kwargs = {"pnginfo": metadata, "format": 'PNG', **save_options("PNG", save_profile)}
+                else:  # JPG格式
+                    # JPG格式：保存为RGB，设置质量，optimize和色度采样由保存档位决定
+                    save_kwargs = {"format": 'JPEG', "quality": 95, **save_options("JPEG", save_profile)}
+
+                if writer is not None:
+                    writer.save(img, os.path.join(output_dir, file), **save_kwargs)
+                else:
+                    img.save(os.path.join(output_dir, file), **save_kwargs)
+            except Exception:
+                discard_placeholder(os.path.join(output_dir, file))
+                raise
                 
             # 生成返回结果信息，包含文件名和路径
             results.append({
@@ -178,37 +180,30 @@ class PD_imagesave_path:
                 "subfolder": output_dir, # 子文件夹路径
                 "type": self.type         # 文件类型
             })
-            counter += 1  # 递增计数器
         
         return results
     
-    def _get_next_counter(self, output_dir, filename_prefix, extension, numberfront, separator):
+    def _allocate_filename(self, output_dir, filename_prefix, extension, numberfront, separator):
         """
-        获取下一个可用的计数器值
+        分配下一个可用的文件名，并创建空文件占位
+        首次保存或目录被外部改动时从1开始找第一个不存在的编号，之后直接沿用缓存的编号
         """
-        try:
-            # 获取目录中的所有文件
-            existing_files = set(os.listdir(output_dir)) if os.path.exists(output_dir) else set()
-            
-            # 从1开始递增，找到第一个不存在的文件名
+        def make_name(counter):
+            if numberfront:
+                # 数字在前面：1_R.ext
+                return f"{counter}{separator}{filename_prefix}{extension}"
+            # 数字在后面：R_1.ext
+            return f"{filename_prefix}{separator}{counter}{extension}"
+
+        def scan(names):
+            existing_files = set(names)
             counter = 1
-            while True:
-                if numberfront:
-                    # 数字在前面：1_R.ext
-                    filename = f"{counter}{separator}{filename_prefix}{extension}"
-                else:
-                    # 数字在后面：R_1.ext
-                    filename = f"{filename_prefix}{separator}{counter}{extension}"
-                
-                # 如果文件不存在，返回这个计数器
-                if filename not in existing_files:
-                    return counter
-                
+            while make_name(counter) in existing_files:
                 counter += 1
-            
-        except Exception as e:
-            print(f"读取目录失败: {e}")
-            return 1
+            return counter
+
+        key = ("PD_imagesave_path", filename_prefix, extension, numberfront, separator)
+        return allocate(output_dir, key, make_name, scan)[1]
 
 
 # 节点类映射：将类名映射到实际的类
@@ -4,7 +4,6 @@ PD图像保存节点 V2
 """
 
 from PIL import Image, ImageOps, ImageSequence
-from PIL.PngImagePlugin import PngInfo
 import os
 import numpy as np
 import json
@@ -15,6 +14,9 @@ from datetime import datetime
 from comfy.cli_args import args
 import folder_paths
 
+from ._file_counter import allocate, discard_placeholder
+from ._save_writer import SAVE_PROFILE_NAMES, get_writer, png_metadata, save_frames, save_options, to_uint8_batch
+
 class PD_SAVE_PATH2:
     """
     PD图像保存路径节点 V2
@@ -51,6 +53,13 @@ class PD_SAVE_PATH2:
                 "embed_metadata": ("BOOLEAN", {"default": True}),  # 是否嵌入元数据
                 "overwrite_mode": (["false", "prefix_as_filename"], {"default": "false"}),  # 覆盖模式
             },
+            "optional": {
+                "async_save": ("BOOLEAN", {"default": False}),  # 异步保存：编码和写盘交给后台线程，节点立即返回
+                "save_workers": ("INT", {"default": 0, "min": 0, "max": 64}),  # 后台写入线程数，0=按CPU核数
+                "encode_workers": ("INT", {"default": 0, "min": 0, "max": 64}),  # 同步保存时多帧并行编码线程数，0=按CPU核数，1=串行
+                "compress_metadata": ("BOOLEAN", {"default": False}),  # PNG中的prompt/工作流以zlib压缩存储(zTXt)
+                "save_profile": (["custom"] + SAVE_PROFILE_NAMES, {"default": "custom"}),  # 编码档位，custom=使用optimize_image设置
+            },
             "hidden": {
                 "prompt": "PROMPT", 
                 "extra_pnginfo": "EXTRA_PNGINFO"
@@ -64,7 +73,9 @@ class PD_SAVE_PATH2:
 
     def save_images(self, images, name="T_", output_dir="", 
                    number_start=True, number_padding=1, filename_delimiter="_", extension="jpg", quality=100, optimize_image=True, lossless_webp=False,
-                   embed_metadata=True, overwrite_mode="false", prompt=None, extra_pnginfo=None):
+                   embed_metadata=True, overwrite_mode="false", prompt=None, extra_pnginfo=None,
+                   async_save=False, save_workers=0, encode_workers=0, compress_metadata=False,
+                   save_profile="custom"):
         """
         保存图像主方法
         
@@ -81,6 +92,11 @@ class PD_SAVE_PATH2:
         - lossless_webp: WebP是否无损
         - embed_metadata: 是否嵌入元数据
         - overwrite_mode: 覆盖模式
+        - async_save: 是否交给后台线程写入，用 PD:Wait Async Saves 节点等待完成
+        - save_workers: 后台写入线程数，0 表示按CPU核数
+        - encode_workers: 同步保存时多帧并行编码线程数，0 表示按CPU核数
+        - compress_metadata: PNG元数据是否压缩存储
+        - save_profile: 编码档位；custom 使用 optimize_image，其他档位决定 png/jpg/webp 的压缩参数，quality 仍然生效
         - prompt: 提示词信息
         - extra_pnginfo: 额外的PNG元数据信息
         
@@ -107,10 +123,12 @@ class PD_SAVE_PATH2:
             os.makedirs(output_dir, exist_ok=True)
             
             # 调用私有方法保存图像到自定义目录
+            writer = get_writer(save_workers) if async_save else None
             self._save_images_to_dir(
                 images, name, output_dir, number_padding, number_start, filename_delimiter, extension, quality,
                 optimize_image, lossless_webp, embed_metadata, overwrite_mode,
-                prompt, extra_pnginfo
+                prompt, extra_pnginfo, writer, encode_workers, compress_metadata,
+                save_profile
             )
             
             # 返回空的结果，不显示预览图
@@ -155,7 +173,8 @@ class PD_SAVE_PATH2:
     def _generate_filename(self, name: str, number_padding: int, 
                           number_start: bool, filename_delimiter: str, extension: str, output_dir: str) -> str:
         """
-        生成唯一的文件名
+        生成唯一的文件名，并创建空文件占位
+        首次保存或目录被外部改动时扫描同扩展名文件的最大编号加一，之后直接沿用缓存的编号
         
         Args:
             name (str): 文件名前缀，空则不加前缀
@@ -189,72 +208,42 @@ class PD_SAVE_PATH2:
         else:  # 无前缀的情况
             # 只有数字: 1.jpg
             pattern = f"(\\d+)"
+        pattern = re.compile(pattern + "$")
         
-        existing_counters = []
-        try:
-            for filename in os.listdir(output_dir):
+        def scan(names):
+            existing_counters = []
+            for filename in names:
                 # 只检查相同扩展名的文件
-                file_ext = os.path.splitext(filename)[1].lower()
-                if file_ext != extension.lower():
+                name_without_ext, file_ext = os.path.splitext(filename)
+                if file_ext.lower() != extension.lower():
                     continue
                 
                 # 移除扩展名再匹配
-                name_without_ext = os.path.splitext(filename)[0]
-                match = re.match(pattern + "$", name_without_ext)
+                match = pattern.match(name_without_ext)
                 if match:
                     existing_counters.append(int(match.group(1)))
-        except Exception as e:
-            print(f"读取目录失败: {e}")
-        
-        # 设置初始计数器值
-        if existing_counters:
-            counter = max(existing_counters) + 1
-        else:
-            counter = 1
-        
-        # 生成文件名
-        if name.strip():  # 有前缀的情况
-            if number_start:
-                # 数字在开头: 1_T_.jpg 或 1T_.jpg（无分隔符）
-                if filename_delimiter:
-                    filename = f"{counter:0{number_padding}}{filename_delimiter}{name}{extension}"
-                else:
-                    filename = f"{counter:0{number_padding}}{name}{extension}"
-            else:
-                # 数字在末尾: T_1.jpg 或 T1.jpg（无分隔符）
-                if filename_delimiter:
-                    filename = f"{name}{filename_delimiter}{counter:0{number_padding}}{extension}"
-                else:
-                    filename = f"{name}{counter:0{number_padding}}{extension}"
-        else:  # 无前缀的情况
-            # 只有数字: 1.jpg
-            filename = f"{counter:0{number_padding}}{extension}"
+            
+            # 设置初始计数器值
+            return max(existing_counters) + 1 if existing_counters else 1
         
-        # 确保文件名唯一
-        while os.path.exists(os.path.join(output_dir, filename)):
-            counter += 1
+        def make_name(counter):
             if name.strip():  # 有前缀的情况
                 if number_start:
                     # 数字在开头: 1_T_.jpg 或 1T_.jpg（无分隔符）
-                    if filename_delimiter:
-                        filename = f"{counter:0{number_padding}}{filename_delimiter}{name}{extension}"
-                    else:
-                        filename = f"{counter:0{number_padding}}{name}{extension}"
-                else:
-                    # 数字在末尾: T_1.jpg 或 T1.jpg（无分隔符）
-                    if filename_delimiter:
-                        filename = f"{name}{filename_delimiter}{counter:0{number_padding}}{extension}"
-                    else:
-                        filename = f"{name}{counter:0{number_padding}}{extension}"
-            else:  # 无前缀的情况
-                # 只有数字: 1.jpg
-                filename = f"{counter:0{number_padding}}{extension}"
+                    return f"{counter:0{number_padding}}{filename_delimiter}{name}{extension}"
+                # 数字在末尾: T_1.jpg 或 T1.jpg（无分隔符）
+                return f"{name}{filename_delimiter}{counter:0{number_padding}}{extension}"
+            # 无前缀的情况，只有数字: 1.jpg
+            return f"{counter:0{number_padding}}{extension}"
         
-        return filename
+        # 已存在的文件名会继续递增，确保文件名唯一
+        key = ("PD_SAVE_PATH2", name, number_padding, number_start, filename_delimiter, extension.lower())
+        return allocate(output_dir, key, make_name, scan)[1]
 
     def _save_images_to_dir(self, images, name, output_dir, number_padding, number_start, filename_delimiter, extension, quality,
                            optimize_image, lossless_webp, embed_metadata, overwrite_mode,
-                           prompt, extra_pnginfo):
+                           prompt, extra_pnginfo, writer=None, encode_workers=0, compress_metadata=False,
+                           save_profile="custom"):
         """
         私有方法：将图像保存到指定目录
         
@@ -262,15 +251,35 @@ class PD_SAVE_PATH2:
         - images: 图像数组
         - name: 文件名前缀，空则不加前缀
         - output_dir: 输出目录路径
+        - writer: 后台写入线程池，为空时在线程池中并行编码，等待全部帧写完
+        - encode_workers: 并行编码线程数
+        - compress_metadata: PNG元数据是否压缩存储
+        - save_profile: 编码档位
         - 其他参数: 各种保存选项
         
         返回：
         - results: 保存结果列表
         """
         results = []
+        frames = []
+        
+        # 整批张量一次转换为 uint8，之后每帧按 numpy 数组处理
+        if isinstance(images, torch.Tensor):
+            images = to_uint8_batch(images)
+        
+        # 元数据在整批开始前只序列化一次
+        pnginfo = prompt_exif = workflow_exif = None
+        if embed_metadata and not args.disable_metadata:
+            if extension.lower() == 'webp':
+                prompt_exif = f"Prompt: {json.dumps(prompt)}" if prompt else None
+                workflow_exif = f"Workflow: {json.dumps(extra_pnginfo)}" if extra_pnginfo else None
+            else:
+                pnginfo = png_metadata(prompt or None, extra_pnginfo or None, compress_metadata)
         
-        # 遍历图像数组，逐个保存
+        # 遍历图像数组，准备文件名、元数据和保存参数
         for batch_number, image in enumerate(images):
+            # 已分配但还没交给写入环节的占位文件，出错时删除，编号可以重新使用
+            placeholder = None
             try:
                 # 转换图像格式
                 if isinstance(image, torch.Tensor):
@@ -305,79 +314,89 @@ class PD_SAVE_PATH2:
                         extension=extension,
                         output_dir=output_dir
                     )
+                    placeholder = os.path.join(output_dir, file_name)
                 
-                # 准备元数据
+                # 准备元数据（PNG信息整批共用；WebP的EXIF需要保留图像自带的标签，逐帧生成）
                 metadata = None
                 if embed_metadata and not args.disable_metadata:
                     if extension.lower() == 'webp':
                         # WebP格式使用EXIF
                         img_exif = img.getexif()
                         if prompt:
-                            img_exif[0x010f] = f"Prompt: {json.dumps(prompt)}"
+                            img_exif[0x010f] = prompt_exif
                         if extra_pnginfo:
-                            workflow_metadata = json.dumps(extra_pnginfo)
-                            img_exif[0x010e] = f"Workflow: {workflow_metadata}"
+                            img_exif[0x010e] = workflow_exif
                         metadata = img_exif.tobytes()
                     else:
                         # 其他格式使用PNG信息
-                        metadata = PngInfo()
-                        if prompt:
-                            metadata.add_text("prompt", json.dumps(prompt))
-                        if extra_pnginfo:
-                            for key, value in extra_pnginfo.items():
-                                metadata.add_text(key, json.dumps(value))
+                        metadata = pnginfo
                 
                 # 构建完整文件路径
                 output_file = os.path.join(output_dir, file_name)
                 
-                # 保存图像
+                # 根据扩展名确定保存参数
                 if extension.lower() in ["jpg", "jpeg"]:
-                    img.save(
-                        output_file,
-                        quality=quality,
-                        optimize=optimize_image
-                    )
+                    save_kwargs = {"quality": quality, "optimize": optimize_image}
                 elif extension.lower() == 'webp':
-                    img.save(
-                        output_file,
-                        quality=quality,
-                        lossless=lossless_webp,
-                        exif=metadata
-                    )
+                    save_kwargs = {"quality": quality, "lossless": lossless_webp, "exif": metadata}
                 elif extension.lower() == 'png':
-                    img.save(
-                        output_file,
-                        pnginfo=metadata,
-                        optimize=optimize_image,
-                        compress_level=self.compress_level
-                    )
+                    save_kwargs = {"pnginfo": metadata, "optimize": optimize_image,
+                                   "compress_level": self.compress_level}
                 elif extension.lower() == 'bmp':
-                    img.save(output_file)
+                    save_kwargs = {}
                 elif extension.lower() == 'tiff':
-                    img.save(
-                        output_file,
-                        quality=quality,
-                        optimize=optimize_image
-                    )
+                    save_kwargs = {"quality": quality, "optimize": optimize_image}
                 else:
-                    img.save(
-                        output_file,
-                        pnginfo=metadata,
-                        optimize=optimize_image
-                    )
+                    save_kwargs = {"pnginfo": metadata, "optimize": optimize_image}
                 
-                print(f"图像已保存到: {output_file}")
+                # 选择了保存档位时，由档位决定 png/jpg/webp 的压缩参数
+                image_format = Image.registered_extensions()[f".{extension.lower()}"]
+                if save_profile != "custom" and image_format in ("PNG", "JPEG", "WEBP"):
+                    save_kwargs.pop("optimize", None)
+                    save_kwargs.pop("compress_level", None)
+                    save_kwargs.update(save_options(image_format, save_profile))
                 
-                # 生成返回结果信息
-                results.append({
-                    "filename": file_name,
-                    "subfolder": output_dir,
-                    "type": self.type
-                })
+                # 保存图像
+                if writer is not None:
+                    # 后台线程先写临时文件，需要显式指定格式
+                    save_kwargs["format"] = image_format
+                    writer.save(img, output_file, **save_kwargs)
+                    placeholder = None
+                    print(f"图像已提交后台保存: {output_file}")
+                    results.append({
+                        "filename": file_name,
+                        "subfolder": output_dir,
+                        "type": self.type
+                    })
+                else:
+                    frames.append((batch_number, file_name, (img, output_file, save_kwargs)))
+                    placeholder = None
                 
             except Exception as e:
+                if placeholder is not None:
+                    discard_placeholder(placeholder)
                 print(f"保存第 {batch_number+1} 个图像失败: {e}")
         
+        # 多帧在线程池中并行编码；覆盖模式下各帧写同一个文件，保持串行
+        if overwrite_mode == "prefix_as_filename":
+            encode_workers = 1
+        errors = save_frames([frame for _, _, frame in frames], encode_workers)
+        for (batch_number, file_name, (_, output_file, _)), error in zip(frames, errors):
+            if error is not None:
+                if overwrite_mode != "prefix_as_filename":
+                    discard_placeholder(output_file)
+                print(f"保存第 {batch_number+1} 个图像失败: {error}")
+                continue
+            
+            print(f"图像已保存到: {output_file}")
+            
+            # 生成返回结果信息
+            results.append({
+                "filename": file_name,
+                "subfolder": output_dir,
+                "type": self.type
+            })
+        
         return results
 
 
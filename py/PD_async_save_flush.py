@@ -0,0 +1,76 @@
+"""
+PD异步保存等待节点
+开启 async_save 的保存节点只负责提交，本节点等待后台写入全部完成，并报告写入数量和失败的文件
+"""
+
+import time
+
+from ._save_writer import current_writer
+
+
+class AnyType(str):
+    def __ne__(self, __value: object) -> bool:
+        return False
+ANY = AnyType("*")
+
+
+class PD_AsyncSaveFlush:
+    """
+    异步保存屏障节点
+    将 trigger 连接到工作流最后执行的节点输出（如 PD_save path 的 success），保证在所有保存提交之后执行
+    """
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "timeout_seconds": ("FLOAT", {"default": 0.0, "min": 0.0, "max": 86400.0, "step": 1.0}),  # 0=一直等待
+            },
+            "optional": {
+                "trigger": (ANY, ),  # 只用于确定执行顺序
+            },
+        }
+
+    @classmethod
+    def IS_CHANGED(cls, **kwargs):
+        # 每次运行都要等待本轮提交的写入
+        return time.time()
+
+    RETURN_TYPES = ("BOOLEAN", "INT", "STRING",)
+    RETURN_NAMES = ("success", "saved_count", "report",)
+    FUNCTION = "wait_saves"
+    OUTPUT_NODE = True
+    CATEGORY = "PD/Image"
+
+    def wait_saves(self, timeout_seconds=0.0, trigger=None):
+        """
+        等待后台写入完成
+        返回 (全部完成且没有失败, 上次等待以来写入的数量, 报告文本)
+        """
+        writer = current_writer()
+        if writer is None:
+            return (True, 0, "没有异步保存任务")
+
+        start = time.perf_counter()
+        finished, written, errors = writer.flush(timeout_seconds or None)
+        elapsed = time.perf_counter() - start
+
+        lines = [f"已写入 {written} 个文件，失败 {len(errors)} 个，等待 {elapsed:.2f} 秒"]
+        if not finished:
+            lines.append(f"等待超过 {timeout_seconds:g} 秒，仍有文件在后台写入")
+        for path, error in errors:
+            lines.append(f"失败: {path}: {error}")
+        report = "\n".join(lines)
+        print(f"[PD_AsyncSaveFlush] {report}")
+        return (finished and not errors, written, report)
+
+
+# 节点类映射：将类名映射到实际的类
+NODE_CLASS_MAPPINGS = {
+    "PD_AsyncSaveFlush": PD_AsyncSaveFlush,
+}
+
+# 节点显示名称映射：定义在UI中显示的节点名称
+NODE_DISPLAY_NAME_MAPPINGS = {
+    "PD_AsyncSaveFlush": "PD:Wait Async Saves",
+}
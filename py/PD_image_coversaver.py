@@ -4,14 +4,14 @@ PD图像覆盖保存节点
 """
 
 from PIL import Image
-from PIL.PngImagePlugin import PngInfo
 import os
 import numpy as np
-import json
 from comfy.cli_args import args
 import folder_paths
 from datetime import datetime
 
+from ._save_writer import SAVE_PROFILE_NAMES, png_metadata, save_frames, save_options, to_uint8_batch
+
 
 class PD_image_coversaver:
     """
@@ -23,7 +23,6 @@ class PD_image_coversaver:
         """初始化保存参数"""
         self.output_dir = folder_paths.get_output_directory()  # 获取默认输出目录
         self.type = "output"  # 输出类型标识
-        self.compress_level = 4  # PNG压缩级别 (0-9, 0为无压缩, 9为最高压缩)
 
     @classmethod
     def INPUT_TYPES(s):
@@ -41,6 +40,11 @@ class PD_image_coversaver:
                 "format": (["png", "jpg"], {"default": "png"}),  # 图像格式选择
                 "show_preview": ("BOOLEAN", {"default": True}),  # 是否在前端显示预览图
             },
+            "optional": {
+                "encode_workers": ("INT", {"default": 0, "min": 0, "max": 64}),  # 多帧并行编码线程数，0=按CPU核数，1=串行
+                "compress_metadata": ("BOOLEAN", {"default": False}),  # PNG中的prompt/工作流以zlib压缩存储(zTXt)
+                "save_profile": (SAVE_PROFILE_NAMES, {"default": "balanced"}),  # 编码档位：fast速度优先，balanced折中，archival归档(PNG最小,JPEG色度完整更大)
+            },
             "hidden": {
                 "prompt": "PROMPT", 
                 "extra_pnginfo": "EXTRA_PNGINFO"
@@ -53,7 +57,8 @@ class PD_image_coversaver:
     CATEGORY = "PD/Image"  # 节点分类
 
     def save_images(self, images, filename="output", custom_output_dir="", 
-                   format="png", show_preview=True, prompt=None, extra_pnginfo=None):
+                   format="png", show_preview=True, encode_workers=0, compress_metadata=False,
+                   save_profile="balanced", prompt=None, extra_pnginfo=None):
         """
         保存图像主方法（覆盖模式）
         
@@ -63,6 +68,9 @@ class PD_image_coversaver:
         - custom_output_dir: 自定义输出目录路径
         - format: 图像格式（png或jpg）
         - show_preview: 是否在前端显示预览图
+        - encode_workers: 多帧并行编码线程数，0 表示按CPU核数
+        - compress_metadata: PNG元数据是否压缩存储
+        - save_profile: 编码档位（fast/balanced/archival）
         - prompt: 提示词信息
         - extra_pnginfo: 额外的PNG元数据信息
         
@@ -83,7 +91,8 @@ class PD_image_coversaver:
             
             # 保存图像到指定目录
             results = self._save_images_to_dir(
-                images, filename, output_dir, format, prompt, extra_pnginfo
+                images, filename, output_dir, format, prompt, extra_pnginfo, encode_workers,
+                compress_metadata, save_profile
             )
             
             # 根据show_preview参数决定返回值
@@ -124,7 +133,8 @@ class PD_image_coversaver:
             target_extension = f".{format.lower()}"
             return f"{filename}{target_extension}"
 
-    def _save_images_to_dir(self, images, filename, output_dir, format, prompt, extra_pnginfo):
+    def _save_images_to_dir(self, images, filename, output_dir, format, prompt, extra_pnginfo, encode_workers=0,
+                            compress_metadata=False, save_profile="balanced"):
         """
         私有方法：将图像保存到指定目录（覆盖模式）
         
@@ -135,46 +145,39 @@ class PD_image_coversaver:
         - format: 图像格式（png或jpg）
         - prompt: 提示词信息
         - extra_pnginfo: 额外PNG信息
+        - encode_workers: 并行编码线程数
+        - compress_metadata: PNG元数据是否压缩存储
+        - save_profile: 编码档位
         
         返回：
         - results: 保存结果列表
         """
         results = list()
+        frames = list()
         
-        # 遍历图像数组，逐个保存
-        for batch_number, image in enumerate(images):
-            # 将张量转换为numpy数组，并缩放到0-255范围
-            # 输入张量形状为 B H W C
-            i = 255. * image.cpu().numpy()
-            
+        # 如果没有禁用元数据且为PNG格式，则添加元数据信息（整批只序列化一次，各帧共用）
+        metadata = None
+        if not args.disable_metadata and format.lower() == "png":
+            metadata = png_metadata(prompt, extra_pnginfo, compress_metadata)
+        
+        # 整批张量一次转换为 uint8，输入张量形状为 B H W C
+        pixels = to_uint8_batch(images)
+        
+        for batch_number, i in enumerate(pixels):
             # 处理alpha通道
             if format.lower() == "png":
                 # PNG格式：支持alpha通道
                 if i.shape[2] == 4:  # 已有alpha通道
-                    img = Image.fromarray(np.clip(i, 0, 255).astype(np.uint8), 'RGBA')
+                    img = Image.fromarray(i, 'RGBA')
                 else:  # 创建透明背景
                     # 添加alpha通道，设置为完全不透明
-                    alpha = np.ones((i.shape[0], i.shape[1], 1), dtype=i.dtype) * 255
-                    i_with_alpha = np.concatenate([i, alpha], axis=2)
-                    img = Image.fromarray(np.clip(i_with_alpha, 0, 255).astype(np.uint8), 'RGBA')
+                    alpha = np.full((i.shape[0], i.shape[1], 1), 255, dtype=np.uint8)
+                    img = Image.fromarray(np.concatenate([i, alpha], axis=2), 'RGBA')
             else:  # JPG格式
                 # JPG不支持alpha通道，转换为RGB
                 if i.shape[2] == 4:  # 如果有alpha通道，移除它
                     i = i[:, :, :3]
-                img = Image.fromarray(np.clip(i, 0, 255).astype(np.uint8), 'RGB')
-            
-            metadata = None
-            
-            # 如果没有禁用元数据且为PNG格式，则添加元数据信息
-            if not args.disable_metadata and format.lower() == "png":
-                metadata = PngInfo()  # 创建PNG信息对象
-                # 添加提示词信息到元数据
-                if prompt is not None:
-                    metadata.add_text("prompt", json.dumps(prompt))
-                # 添加额外PNG信息到元数据
-                if extra_pnginfo is not None:
-                    for x in extra_pnginfo:
-                        metadata.add_text(x, json.dumps(extra_pnginfo[x]))
+                img = Image.fromarray(i, 'RGB')
             
             # 智能处理文件名后缀
             if len(images) > 1:
@@ -188,25 +191,15 @@ class PD_image_coversaver:
             # 完整文件路径
             filepath = os.path.join(output_dir, file)
             
-            # 根据格式保存图像（直接覆盖）
+            # 根据格式确定保存参数（直接覆盖）
             if format.lower() == "png":
-                # PNG格式：保存为RGBA，包含元数据和指定的压缩级别
-                img.save(
-                    filepath,
-                    pnginfo=metadata,
-                    compress_level=self.compress_level,
-                    format='PNG'
-                )
+                # PNG格式：保存为RGBA，包含元数据，压缩级别由保存档位决定
+                save_kwargs = {"pnginfo": metadata, "format": 'PNG', **save_options("PNG", save_profile)}
             else:  # JPG格式
-                # JPG格式：保存为RGB，设置质量
-                img.save(
-                    filepath,
-                    format='JPEG',
-                    quality=95,  # JPG质量设置
-                    optimize=True
-                )
+                # JPG格式：保存为RGB，设置质量，optimize和色度采样由保存档位决定
+                save_kwargs = {"format": 'JPEG', "quality": 95, **save_options("JPEG", save_profile)}
             
-            print(f"图像已保存: {filepath}")
+            frames.append((img, filepath, save_kwargs))
             
             # 生成返回结果信息，包含文件名和路径
             results.append({
@@ -215,6 +208,13 @@ class PD_image_coversaver:
                 "type": self.type         # 文件类型
             })
         
+        # 多帧在线程池中并行编码，结果按原顺序对应
+        errors = save_frames(frames, encode_workers)
+        for (_, filepath, _), error in zip(frames, errors):
+            if error is not None:
+                raise error
+            print(f"图像已保存: {filepath}")
+        
         return results
 
 
@@ -2,10 +2,11 @@ import os
 import torch
 import numpy as np
 from pathlib import Path
-from PIL import Image, ImageOps
 import folder_paths
 import unicodedata
 
+from ._image_loading import STORAGE_DTYPES, load_image_array, pixels_to_tensor
+
 class PD_ImageSearch:
     """
     图片搜索节点：根据关键字在指定文件夹中搜索图片
@@ -25,6 +26,14 @@ class PD_ImageSearch:
                     "multiline": False,
                     "placeholder": "搜索关键字"
                 }),
+            },
+            "optional": {
+                "use_decode_cache": ("BOOLEAN", {
+                    "default": False
+                }),
+                "pixel_storage": (STORAGE_DTYPES, {
+                    "default": "float32"
+                }),
             }
         }
     
@@ -35,7 +44,7 @@ class PD_ImageSearch:
     DESCRIPTION = "根据关键字在指定文件夹中搜索图片并返回所有匹配的图片列表和txt文本内容"
     OUTPUT_IS_LIST = (True, True, True)
 
-    def search_images(self, input_path, word):
+    def search_images(self, input_path, word, use_decode_cache=False, pixel_storage="float32"):
         """
         图片搜索主函数
         """
@@ -98,19 +107,11 @@ class PD_ImageSearch:
             
             for file_path in matching_image_files:
                 try:
-                    image = Image.open(str(file_path))
-                    
-                    # 转换为RGB模式（如果不是的话）
-                    if image.mode != 'RGB':
-                        image = image.convert('RGB')
-                    
-                    # 处理EXIF旋转信息
-                    image = ImageOps.exif_transpose(image)
-                    
-                    # 转换为numpy数组
-                    image_array = np.array(image).astype(np.float32) / 255.0
+                    # 读取并处理EXIF旋转信息，可选使用磁盘解码缓存
+                    image_array = load_image_array(str(file_path), use_decode_cache)
                     
-                    images.append(image_array)
+                    # 只保留RGB通道，按 pixel_storage 转换（默认 float32）
+                    images.append(pixels_to_tensor(image_array[..., :3], pixel_storage))
                     image_names.append(file_path.stem)
                     
                 except Exception as e:
@@ -122,11 +123,10 @@ class PD_ImageSearch:
             
             # 将每张图片转换为单独的张量 (1HWC格式)
             image_tensors = []
-            for image_array in images:
+            for image_tensor in images:
                 # 添加batch维度
-                if len(image_array.shape) == 3:
-                    image_array = np.expand_dims(image_array, axis=0)
-                image_tensor = torch.from_numpy(image_array)
+                if len(image_tensor.shape) == 3:
+                    image_tensor = image_tensor[None,]
                 image_tensors.append(image_tensor)
             
             # 读取所有匹配的txt文件内容
@@ -0,0 +1,129 @@
+"""
+解码结果的磁盘缓存
+以 (路径, mtime, 文件大小, EXIF 方向) 为键，把解码后的 uint8 数组存成 .npy，读取时内存映射，
+总大小超过上限时按最近使用时间淘汰
+"""
+
+import hashlib
+import os
+import threading
+
+import numpy as np
+from PIL import Image
+
+# 缓存目录和容量上限可以通过环境变量调整
+CACHE_DIR_ENV = "PDUSE_DECODE_CACHE_DIR"
+CACHE_MB_ENV = "PDUSE_DECODE_CACHE_MB"
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache", "decoded_images")
+DEFAULT_CACHE_MB = 8192
+
+# EXIF Orientation 标签
+ORIENTATION_TAG = 0x0112
+
+
+class DecodedImageCache:
+    """进程内共享的解码缓存，多个线程/进程同时读写时通过原子替换保证不会读到半截文件"""
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total_bytes = None
+
+    def make_key(self, path: str, max_side: int = 0) -> str:
+        """文件未改动且方向相同，解码结果就相同；缩小解码的结果按 max_side 分开缓存"""
+        st = os.stat(path)
+        with Image.open(path) as img:
+            orientation = img.getexif().get(ORIENTATION_TAG, 1)
+        raw = f"{os.path.abspath(path)}|{st.st_mtime_ns}|{st.st_size}|{orientation}"
+        if max_side > 0:
+            raw += f"|{max_side}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def _blob_path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], f"{key}.npy")
+
+    def get(self, key: str):
+        """命中时返回只读的内存映射数组，并刷新其最近使用时间"""
+        blob = self._blob_path(key)
+        try:
+            array = np.load(blob, mmap_mode="r")
+            os.utime(blob)
+            return array
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key: str, array: np.ndarray) -> None:
+        blob = self._blob_path(key)
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        tmp = f"{blob}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                np.save(f, array)
+            os.replace(tmp, blob)
+        except OSError as e:
+            print(f"PD 解码缓存: 写入失败 {blob} - {e}")
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return
+
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = self._scan_size()
+            else:
+                self._total_bytes += os.path.getsize(blob)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _list_blobs(self):
+        blobs = []
+        for root, _, files in os.walk(self.root):
+            for name in files:
+                if name.endswith(".npy"):
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    blobs.append((st.st_mtime, st.st_size, path))
+        return blobs
+
+    def _scan_size(self) -> int:
+        return sum(size for _, size, _ in self._list_blobs())
+
+    def _evict(self) -> None:
+        """淘汰最久未使用的条目，降到上限的 90% 以下，避免每次写入都触发扫描"""
+        blobs = sorted(self._list_blobs())
+        total = sum(size for _, size, _ in blobs)
+        target = self.max_bytes * 0.9
+        removed = 0
+        for _, size, path in blobs:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                removed += 1
+            except OSError:
+                continue
+        self._total_bytes = total
+        if removed:
+            print(f"PD 解码缓存: 淘汰 {removed} 个条目，当前 {total / 1024 / 1024:.0f} MB")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_decode_cache() -> DecodedImageCache:
+    """获取全局缓存实例"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            root = os.environ.get(CACHE_DIR_ENV) or DEFAULT_CACHE_DIR
+            try:
+                max_mb = int(os.environ.get(CACHE_MB_ENV, DEFAULT_CACHE_MB))
+            except ValueError:
+                max_mb = DEFAULT_CACHE_MB
+            _cache = DecodedImageCache(root, max_mb * 1024 * 1024)
+        return _cache
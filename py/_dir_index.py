@@ -0,0 +1,170 @@
+"""
+递归图片目录的增量索引
+每个根目录保存一份索引（目录 mtime、图片文件的大小/mtime、预先计算好的排序键），
+再次列出时只重新扫描 mtime 变化过的目录，未变化的整棵树直接返回缓存的排序结果
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+
+INDEX_VERSION = 1
+INDEX_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache", "dir_index")
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp', '.bmp', '.tiff', '.gif'}
+
+# 文件条目字段：[名称, 大小, mtime_ns, 数字排序键, 自然排序键]
+NAME, SIZE, MTIME, NUMERIC_KEY, NATURAL_KEY = range(5)
+
+_indexes = {}
+_lock = threading.Lock()
+
+
+def numeric_sort_key(filename: str):
+    """数字排序键：取文件名中第一个数字，如 1.jpg, 2.jpg, 10.jpg, 100.jpg"""
+    name, _ = os.path.splitext(filename)
+    numbers = re.findall(r'\d+', name)
+    if numbers:
+        return [int(numbers[0]), filename]
+    return [0, filename]
+
+
+def natural_sort_key(filename: str):
+    """自然排序键：数字部分按数值比较，其余部分忽略大小写"""
+    return [int(part) if part.isdigit() else part.lower() for part in re.split(r'(\d+)', filename)]
+
+
+def _index_path(root: str) -> str:
+    return os.path.join(INDEX_DIR, hashlib.sha1(root.encode("utf-8")).hexdigest() + ".json")
+
+
+def _load_index(root: str):
+    if root in _indexes:
+        return _indexes[root]
+    index = None
+    try:
+        with open(_index_path(root), "r", encoding="utf-8") as f:
+            index = json.load(f)
+        if index.get("version") != INDEX_VERSION or index.get("root") != root:
+            index = None
+    except (OSError, ValueError):
+        index = None
+    if index is None:
+        index = {"version": INDEX_VERSION, "root": root, "dirs": {}, "sorted": {}}
+    _indexes[root] = index
+    return index
+
+
+def _save_index(index) -> None:
+    path = _index_path(index["root"])
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(INDEX_DIR, exist_ok=True)
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(index, f, ensure_ascii=False)
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"PD 目录索引: 写入失败 {path} - {e}")
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _scan_dir(path: str, mtime: int):
+    """扫描单个目录，返回新的目录条目；保持 os.scandir 的顺序，与 os.walk 一致"""
+    files = []
+    subdirs = []
+    with os.scandir(path) as it:
+        for entry in it:
+            try:
+                if entry.is_dir():
+                    # 与 os.walk 默认行为一致：不进入符号链接目录
+                    if not entry.is_symlink():
+                        subdirs.append(entry.name)
+                    continue
+                if os.path.splitext(entry.name)[1].lower() not in IMAGE_EXTENSIONS:
+                    continue
+                st = entry.stat()
+            except OSError:
+                continue
+            files.append([entry.name, st.st_size, st.st_mtime_ns,
+                          numeric_sort_key(entry.name), natural_sort_key(entry.name)])
+    return {"mtime": mtime, "files": files, "subdirs": subdirs}
+
+
+def _refresh(index):
+    """按目录 mtime 增量刷新索引，返回 (重新扫描的目录数量, 索引是否变化)"""
+    root = index["root"]
+    old_dirs = index["dirs"]
+    new_dirs = {}
+    rescanned = 0
+    stack = [""]
+    while stack:
+        rel = stack.pop()
+        path = os.path.join(root, rel) if rel else root
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            continue
+        entry = old_dirs.get(rel)
+        if entry is None or entry["mtime"] != mtime:
+            try:
+                entry = _scan_dir(path, mtime)
+            except OSError:
+                continue
+            rescanned += 1
+        new_dirs[rel] = entry
+        # 逆序入栈，出栈顺序即为自上而下的遍历顺序
+        for name in reversed(entry["subdirs"]):
+            stack.append(os.path.join(rel, name) if rel else name)
+
+    changed = bool(rescanned) or new_dirs.keys() != old_dirs.keys()
+    if changed:
+        index["dirs"] = new_dirs
+        index["sorted"] = {}
+    return rescanned, changed
+
+
+def list_image_files(directory: str, sort_method: str = "numeric"):
+    """
+    递归列出目录下的所有图片并排序，返回 (文件路径列表, 目录数量, 重新扫描的目录数量)
+    返回的路径以传入的 directory 为前缀，与 os.walk + os.path.join 的结果一致
+    """
+    root = os.path.abspath(directory)
+    if sort_method not in ("numeric", "alphabetic", "natural"):
+        sort_method = "numeric"
+
+    with _lock:
+        index = _load_index(root)
+        rescanned, changed = _refresh(index)
+
+        order = index["sorted"].get(sort_method)
+        if order is None:
+            # 遍历顺序中的 (目录, 文件条目)，排序是稳定的，同名文件保持遍历顺序
+            entries = []
+            stack = [""]
+            while stack:
+                rel = stack.pop()
+                entry = index["dirs"].get(rel)
+                if entry is None:
+                    continue
+                entries.extend((rel, f) for f in entry["files"])
+                for name in reversed(entry["subdirs"]):
+                    stack.append(os.path.join(rel, name) if rel else name)
+
+            if sort_method == "numeric":
+                entries.sort(key=lambda e: e[1][NUMERIC_KEY])
+            elif sort_method == "alphabetic":
+                entries.sort(key=lambda e: e[1][NAME].lower())
+            else:
+                entries.sort(key=lambda e: e[1][NATURAL_KEY])
+            order = [os.path.join(rel, f[NAME]) if rel else f[NAME] for rel, f in entries]
+            index["sorted"][sort_method] = order
+            changed = True
+
+        if changed:
+            _save_index(index)
+        dir_count = len(index["dirs"])
+
+    return [os.path.join(directory, rel_path) for rel_path in order], dir_count, rescanned
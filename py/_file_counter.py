@@ -0,0 +1,91 @@
+"""
+顺序编号保存节点共用的文件名计数器
+每个 (目录, 命名规则) 缓存下一个候选编号，只有目录 mtime 被其他程序改动过时才重新扫描目录，
+连续保存时分配文件名不再需要列出整个目录。文件名用 O_EXCL 创建空文件占位，
+并行的保存队列（包括其他进程）不会拿到同一个文件名
+"""
+
+import os
+import threading
+
+_lock = threading.Lock()
+# 目录 -> (本进程最后一次改动后的 mtime_ns, 缓存代数)
+_dirs = {}
+# (目录, 命名规则) -> (下一个候选编号, 缓存代数)
+_counters = {}
+
+
+def _dir_generation(output_dir, mtime_ns):
+    """目录 mtime 与本进程记录的不一致时说明被外部改动过，代数加一使该目录下的缓存全部失效"""
+    recorded = _dirs.get(output_dir)
+    if recorded is None:
+        generation = 0
+    elif recorded[0] != mtime_ns:
+        generation = recorded[1] + 1
+    else:
+        return recorded[1]
+    _dirs[output_dir] = (mtime_ns, generation)
+    return generation
+
+
+def allocate(output_dir, key, make_name, scan):
+    """
+    分配一个未被占用的编号并创建同名空文件占位，返回 (编号, 文件名)
+    - key: 命名规则（可哈希），同一目录下不同规则的编号分别缓存
+    - make_name(counter): 由编号生成文件名
+    - scan(names): 缓存失效时由目录中的文件名列表得到起始编号
+    起始编号对应的文件已存在时继续向后尝试
+    """
+    output_dir = os.path.abspath(output_dir)
+    with _lock:
+        generation = _dir_generation(output_dir, os.stat(output_dir).st_mtime_ns)
+        cached = _counters.get((output_dir, key))
+        if cached is not None and cached[1] == generation:
+            counter = cached[0]
+        else:
+            counter = scan(os.listdir(output_dir))
+
+        while True:
+            name = make_name(counter)
+            try:
+                fd = os.open(os.path.join(output_dir, name), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                counter += 1
+                continue
+            os.close(fd)
+            break
+
+        # 占位文件是本进程创建的，记录新的 mtime，缓存继续有效
+        _dirs[output_dir] = (os.stat(output_dir).st_mtime_ns, generation)
+        _counters[(output_dir, key)] = (counter + 1, generation)
+        return counter, name
+
+
+def note_own_change(output_dir):
+    """本进程在目录中替换或删除了文件（如临时文件改名），刷新记录的 mtime，不让编号缓存失效"""
+    output_dir = os.path.abspath(output_dir)
+    with _lock:
+        recorded = _dirs.get(output_dir)
+        if recorded is not None:
+            try:
+                _dirs[output_dir] = (os.stat(output_dir).st_mtime_ns, recorded[1])
+            except OSError:
+                pass
+
+
+def discard_placeholder(path):
+    """
+    保存失败时删除 allocate 创建的空占位文件，已有内容的文件不动
+    删除后该目录的编号缓存失效，下次分配重新扫描目录，空出的编号可以再次使用
+    """
+    try:
+        if os.path.getsize(path) != 0:
+            return
+        os.remove(path)
+    except OSError:
+        return
+    output_dir = os.path.abspath(os.path.dirname(path))
+    with _lock:
+        recorded = _dirs.get(output_dir)
+        if recorded is not None:
+            _dirs[output_dir] = (recorded[0], recorded[1] + 1)
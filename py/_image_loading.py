@@ -0,0 +1,148 @@
+"""
+目录加载类节点共用的图片解码工具
+文件名以下划线开头，不会被 __init__.py 当作节点模块注册
+"""
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+import numpy as np
+import torch
+from PIL import Image, ImageOps
+
+from ._decode_cache import get_decode_cache
+from ._image_ops import draft_for_max_side
+from ._parallel import resolve_workers
+
+# 加载后像素的存储类型：float16 内存减半；IMAGE/MASK 必须是 0-1 浮点，下游节点才能直接使用
+STORAGE_DTYPES = ["float32", "float16"]
+
+
+def decode_image_array(image_path: str, max_side: int = 0) -> np.ndarray:
+    """
+    解码单张图片：exif 旋转后转 RGB
+    返回 uint8 数组 [H, W, 3]，有透明通道时为 [H, W, 4]（第 4 通道为 alpha）
+    max_side > 0 时把最长边缩小到 max_side（JPEG 先用 draft 降采样解码）
+    """
+    with Image.open(image_path) as i:
+        draft_for_max_side(i, max_side)
+        i = ImageOps.exif_transpose(i)
+        if max_side > 0 and max(i.size) > max_side:
+            scale = max_side / max(i.size)
+            new_size = (max(1, round(i.width * scale)), max(1, round(i.height * scale)))
+            i = i.resize(new_size, Image.Resampling.LANCZOS)
+        rgb = np.array(i.convert("RGB"))
+        if 'A' in i.getbands():
+            return np.dstack([rgb, np.array(i.getchannel('A'))])
+        return rgb
+
+
+def load_image_array(image_path: str, use_cache: bool = False, max_side: int = 0) -> np.ndarray:
+    """同 decode_image_array，use_cache 为 True 时先查磁盘解码缓存"""
+    if not use_cache:
+        return decode_image_array(image_path, max_side)
+
+    cache = get_decode_cache()
+    key = cache.make_key(image_path, max_side)
+    array = cache.get(key)
+    if array is None:
+        array = decode_image_array(image_path, max_side)
+        cache.put(key, array)
+    return array
+
+
+def pixels_to_tensor(pixels: np.ndarray, storage: str = "float32") -> torch.Tensor:
+    """
+    uint8 像素转张量，按 storage（float32/float16）归一化到 0-1
+    """
+    dtype = np.float16 if storage == "float16" else np.float32
+    return torch.from_numpy(pixels.astype(dtype) / 255.0)
+
+
+def constant_mask(height: int, width: int, value: float, storage: str = "float32") -> torch.Tensor:
+    """
+    纯色遮罩，按 storage 分配完整张量（float16 内存减半）
+    遮罩会直接交给下游节点，不能用广播视图：各像素共用一个存储单元，下游原地修改会出错或改动整张遮罩
+    """
+    dtype = torch.float16 if storage == "float16" else torch.float32
+    return torch.full((height, width), value, dtype=dtype, device="cpu")
+
+
+def load_image_tensor(image_path: str, use_cache: bool = False, storage: str = "float32", max_side: int = 0):
+    """
+    读取单张图片并归一化
+    返回 (image [1, H, W, 3], mask [H, W])，没有透明通道时遮罩全为 0
+    storage 见 STORAGE_DTYPES
+    """
+    array = load_image_array(image_path, use_cache, max_side)
+
+    # 转换为张量格式 [B, H, W, C]
+    image = pixels_to_tensor(array[..., :3], storage)[None,]  # 添加batch维度
+
+    # 处理透明通道作为遮罩 [B, H, W]
+    if array.shape[2] == 4:
+        alpha = pixels_to_tensor(array[..., 3], storage)
+        mask = 1. - alpha  # 反转遮罩
+    else:
+        # 如果没有透明通道，创建默认遮罩
+        height, width = image.shape[1], image.shape[2]
+        mask = constant_mask(height, width, 0.0, storage)
+
+    return image, mask
+
+
+def iter_decoded(paths, decode=load_image_tensor, workers: int = 1, prefetch: int = 0):
+    """
+    按输入顺序逐个产出 (path, result, error)
+    workers > 1 时在线程池中解码，最多提前提交 prefetch 个任务（默认 workers 的 2 倍），
+    调用方提前结束迭代时，尚未开始的任务会被取消
+    """
+    if workers <= 1:
+        for path in paths:
+            try:
+                yield path, decode(path), None
+            except Exception as e:
+                yield path, None, e
+        return
+
+    prefetch = max(prefetch or workers * 2, workers)
+    path_iter = iter(paths)
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pd_decode") as pool:
+        try:
+            for path in islice(path_iter, prefetch):
+                pending.append((path, pool.submit(decode, path)))
+
+            while pending:
+                path, future = pending.popleft()
+                # 先补充队列再等待结果，保持 prefetch 个任务在途
+                for next_path in islice(path_iter, 1):
+                    pending.append((next_path, pool.submit(decode, next_path)))
+                try:
+                    yield path, future.result(), None
+                except Exception as e:
+                    yield path, None, e
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+
+def iter_decoded_pairs(pairs, decode=load_image_tensor, workers: int = 1, prefetch: int = 0):
+    """
+    成对解码，按输入顺序逐对产出 ((path1, path2), (result1, result2), error)
+    两侧图片展开成同一个任务序列，一对的两张图在线程池中同时解码；prefetch 以“对”为单位
+    任意一侧失败时整对返回该异常
+    """
+    paths = (path for pair in pairs for path in pair)
+    decoded = iter_decoded(paths, decode=decode, workers=workers, prefetch=prefetch * 2)
+    try:
+        for path1, result1, error1 in decoded:
+            path2, result2, error2 = next(decoded)
+            error = error1 if error1 is not None else error2
+            if error is not None:
+                yield (path1, path2), None, error
+            else:
+                yield (path1, path2), (result1, result2), None
+    finally:
+        decoded.close()
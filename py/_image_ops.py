@@ -0,0 +1,139 @@
+"""
+图片编码、缩放和批量转换共用的函数：原子写入、保存档位、JPEG 降采样解码、PD_rename_image 的单文件处理
+"""
+
+import math
+import os
+import threading
+
+from PIL import Image
+
+# 保存档位：fast 速度优先，balanced 为默认折中，archival 归档（quality 不受档位影响）：
+# PNG/WebP 用最强压缩，体积最小；JPEG 保留完整色度（4:4:4），画质最好，但文件比 balanced 大
+# - png: zlib 压缩级别；compress_type 为 zlib 策略，3 = Z_RLE，低级别下比默认策略更快、体积更小；
+#        optimize 时 PIL 使用最高压缩级别并额外搜索最优设置，大图非常慢
+# - jpeg: optimize 为优化霍夫曼表；subsampling 0 = 4:4:4（色度不降采样，文件更大），2 = 4:2:0
+# - webp: method 0-6，越大越慢、体积越小
+# - 其他格式只区分是否 optimize
+SAVE_PROFILES = {
+    "fast": {
+        "png": {"compress_level": 1, "compress_type": 3},
+        "jpeg": {"optimize": False, "subsampling": 2},
+        "webp": {"method": 0},
+        "optimize": False,
+    },
+    "balanced": {
+        "png": {"compress_level": 4},
+        "jpeg": {"optimize": True},
+        "webp": {"method": 4},
+        "optimize": False,
+    },
+    "archival": {
+        "png": {"compress_level": 9, "optimize": True},
+        "jpeg": {"optimize": True, "subsampling": 0},
+        "webp": {"method": 6},
+        "optimize": True,
+    },
+}
+
+
+def save_options(image_format, profile="balanced"):
+    """按档位返回 PIL save() 的编码参数（不含 quality），image_format 为 PIL 格式名，如 PNG、JPEG"""
+    settings = SAVE_PROFILES[profile]
+    key = (image_format or "").lower()
+    if key in ("png", "jpeg", "webp"):
+        return dict(settings[key])
+    return {"optimize": settings["optimize"]}
+
+
+def draft_for_max_side(img, max_side: int):
+    """
+    JPEG 在 DCT 域直接按 1/2、1/4、1/8 缩小解码，结果的最长边仍不小于 max_side
+    必须在图片像素加载之前调用；其他格式不做处理。返回原始尺寸 (宽, 高)
+    """
+    original_size = img.size
+    if max_side <= 0 or img.format != "JPEG":
+        return original_size
+    width, height = original_size
+    longer = max(width, height)
+    if longer > max_side:
+        scale = max_side / longer
+        img.draft(img.mode, (math.ceil(width * scale), math.ceil(height * scale)))
+    return original_size
+
+
+def resize_image_keep_ratio(image, max_size, source_size=None):
+    """保持宽高比调整图片尺寸
+
+    source_size 为 draft 降采样解码前的原始尺寸，保证目标尺寸与全尺寸解码时一致
+    """
+    width, height = source_size or image.size
+
+    # 计算缩放比例
+    if width > height:
+        if width > max_size:
+            ratio = max_size / width
+            new_width = max_size
+            new_height = int(height * ratio)
+        else:
+            return image
+    else:
+        if height > max_size:
+            ratio = max_size / height
+            new_height = max_size
+            new_width = int(width * ratio)
+        else:
+            return image
+
+    return image.resize((new_width, new_height), Image.Resampling.LANCZOS)
+
+
+def save_atomic(image, path, **save_kwargs):
+    """先写入同目录的临时文件再替换，失败时不会留下写了一半的图片"""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        image.save(tmp_path, **save_kwargs)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def convert_image_file(task):
+    """
+    PD_rename_image 的单文件处理：格式转换、缩放、保存，新文件名不同时删除原文件
+    task: (old_file_path, new_file_path, max_size, output_format, save_profile)
+    """
+    old_file_path, new_file_path, max_size, output_format, save_profile = task
+
+    # 打开并处理图片
+    with Image.open(old_file_path) as img:
+        # JPEG 直接按 1/2、1/4、1/8 缩小解码，省去全尺寸解码的时间和内存
+        source_size = draft_for_max_side(img, max_size)
+
+        # 转换为RGB模式（对于JPG格式）
+        if output_format.upper() == "JPG" and img.mode in ("RGBA", "LA", "P"):
+            # 创建白色背景
+            background = Image.new("RGB", img.size, (255, 255, 255))
+            if img.mode == "P":
+                img = img.convert("RGBA")
+            background.paste(img, mask=img.split()[-1] if img.mode == "RGBA" else None)
+            img = background
+        elif output_format.upper() == "PNG" and img.mode not in ("RGBA", "RGB", "L"):
+            img = img.convert("RGBA")
+        # 调整图片尺寸
+        resized_img = resize_image_keep_ratio(img, max_size, source_size)
+
+        # 保存处理后的图片
+        save_kwargs = {}
+        if output_format.upper() == "JPG":
+            save_kwargs = {"format": "JPEG", "quality": 95, **save_options("JPEG", save_profile)}
+        elif output_format.upper() == "PNG":
+            save_kwargs = {"format": "PNG", **save_options("PNG", save_profile)}
+
+        save_atomic(resized_img, new_file_path, **save_kwargs)
+
+    # 如果新文件名与原文件名不同，删除原文件
+    if old_file_path != new_file_path and os.path.exists(new_file_path):
+        os.remove(old_file_path)
@@ -0,0 +1,93 @@
+"""
+遮罩选择类节点共用的连通区域工具
+一次标记得到全部区域的统计信息，选区、裁切和多区域输出都复用同一次标记结果
+"""
+
+import numpy as np
+import torch
+import cv2
+
+# regions 数组的列：(标签, x, y, 宽, 高, 面积)
+LABEL, X, Y, W, H, AREA = range(6)
+
+
+def connected_regions(mask_uint8, min_area=0):
+    """
+    检测连通区域（8 邻域），返回 (regions, cx, labels)
+    regions 为 [N, 6] 整数数组，按标签顺序排列；cx 为对应的质心横坐标；labels 为标签图
+    """
+    num_labels, labels, stats, centroids = cv2.connectedComponentsWithStats(
+        mask_uint8, connectivity=8
+    )
+    ids = np.arange(1, num_labels)  # 跳过背景
+    stats = stats[1:]
+    cx = centroids[1:, 0]
+
+    keep = stats[:, cv2.CC_STAT_AREA] >= min_area
+    ids, stats, cx = ids[keep], stats[keep], cx[keep]
+
+    regions = np.column_stack([
+        ids,
+        stats[:, cv2.CC_STAT_LEFT],
+        stats[:, cv2.CC_STAT_TOP],
+        stats[:, cv2.CC_STAT_WIDTH],
+        stats[:, cv2.CC_STAT_HEIGHT],
+        stats[:, cv2.CC_STAT_AREA],
+    ]).astype(np.int64)
+    return regions, cx, labels
+
+
+def region_order(regions, cx, sort_by="left_to_right"):
+    """返回排序后的下标；稳定排序，相同键值保持标签顺序"""
+    if sort_by == "left_to_right":
+        return np.argsort(cx, kind="stable")
+    return np.argsort(-regions[:, AREA], kind="stable")
+
+
+def crop_box(region, padding, height, width):
+    """区域外扩 padding 后的裁切框 (x1, y1, x2, y2)，不超出画面"""
+    x, y, w, h = (int(v) for v in region[X:AREA])
+    return (
+        max(0, x - padding),
+        max(0, y - padding),
+        min(width, x + w + padding),
+        min(height, y + h + padding),
+    )
+
+
+def region_mask(labels, label, box):
+    """只在裁切框内比较标签，返回该区域的 bool 遮罩，不生成整帧大小的单区域遮罩"""
+    x1, y1, x2, y2 = box
+    return torch.from_numpy(labels[y1:y2, x1:x2] == label)
+
+
+def extract_region(image, labels, label, box, full_canvas=False):
+    """
+    取出单个区域，返回 (图像 [h, w, C], 遮罩 [h, w])，均为 float32
+    full_canvas 时输出整帧大小，区域外为 0；否则输出裁切框内的原图
+    """
+    x1, y1, x2, y2 = box
+    sel_mask = region_mask(labels, label, box)
+    if not full_canvas:
+        return image[y1:y2, x1:x2].float(), sel_mask.float()
+
+    height, width = labels.shape
+    out_img = torch.zeros((height, width, image.shape[-1]), dtype=torch.float32)
+    out_msk = torch.zeros((height, width), dtype=torch.float32)
+    out_msk[y1:y2, x1:x2] = sel_mask
+    out_img[y1:y2, x1:x2] = image[y1:y2, x1:x2] * sel_mask[..., None]
+    return out_img, out_msk
+
+
+def region_info(batch_index, index, region, box):
+    """bboxes 输出中单个区域的信息"""
+    return {
+        "batch": batch_index,
+        "index": index,
+        "x": int(region[X]),
+        "y": int(region[Y]),
+        "w": int(region[W]),
+        "h": int(region[H]),
+        "area": int(region[AREA]),
+        "crop": [int(v) for v in box],
+    }
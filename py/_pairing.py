@@ -0,0 +1,78 @@
+"""
+双文件夹配对引擎
+每个文件名只规范化一次，生成 (匹配方式, 基础名称) 形式的规范键，两侧各建一个字典索引后 O(n) 配对，
+并返回两侧未匹配的文件名
+"""
+
+# 匹配方式按优先级排列：后缀、前缀、中间位置
+SUFFIX_UNDERSCORE = "后缀匹配(_)"
+SUFFIX = "后缀匹配"
+PREFIX_UNDERSCORE = "前缀匹配(_)"
+PREFIX = "前缀匹配"
+MIDDLE = "中间匹配"
+EXACT = "完全匹配"
+
+
+def pair_keys(name, identifier, allow_middle=True):
+    """
+    按优先级生成文件名的规范键 [(匹配方式, 基础名称), ...]
+    例如 identifier="T" 时：65_T -> 后缀(_) "65"，T1_00001 -> 前缀 "1_00001"，65_T_00001 -> 中间 "65_00001"
+    """
+    keys = []
+    tag = f"_{identifier}"
+    if name.endswith(tag):
+        base = name[:len(name) - len(tag)]
+        keys.append((SUFFIX_UNDERSCORE, base))
+    if name.endswith(identifier):
+        base = name[:len(name) - len(identifier)]
+        keys.append((SUFFIX, base))
+    tag = f"{identifier}_"
+    if name.startswith(tag):
+        base = name[len(tag):]
+        keys.append((PREFIX_UNDERSCORE, base))
+    if name.startswith(identifier):
+        base = name[len(identifier):]
+        keys.append((PREFIX, base))
+    tag = f"_{identifier}_"
+    if allow_middle and identifier and tag in name:
+        base = name.replace(tag, "_")
+        keys.append((MIDDLE, base))
+    return keys
+
+
+def match_pairs(names1, names2, identifier1="", identifier2=""):
+    """
+    配对两侧的文件名（不含扩展名）
+    返回 (matches, unmatched1, unmatched2)，matches 为 [(名称1, 名称2, 基础名称, 匹配方式), ...]，按基础名称排序
+    两个标识符都为空时使用完全匹配；names1 按给定顺序依次认领，每个名称2 最多匹配一次
+    """
+    matches = []
+    matched2 = set()
+
+    if not identifier1 and not identifier2:
+        index2 = set(names2)
+        for name1 in names1:
+            if name1 in index2 and name1 not in matched2:
+                matches.append((name1, name1, name1, EXACT))
+                matched2.add(name1)
+    elif identifier1:
+        # 中间位置匹配要求两侧标识符都不为空
+        allow_middle = bool(identifier2)
+        index2 = {}
+        for name2 in names2:
+            for match_type, base in pair_keys(name2, identifier2, allow_middle):
+                index2.setdefault((match_type, base), name2)
+
+        for name1 in names1:
+            for match_type, base in pair_keys(name1, identifier1, allow_middle):
+                name2 = index2.get((match_type, base))
+                if name2 is not None and name2 not in matched2:
+                    matches.append((name1, name2, base, match_type))
+                    matched2.add(name2)
+                    break
+
+    matched1 = {m[0] for m in matches}
+    unmatched1 = [name for name in names1 if name not in matched1]
+    unmatched2 = [name for name in names2 if name not in matched2]
+    matches.sort(key=lambda x: x[2])
+    return matches, unmatched1, unmatched2
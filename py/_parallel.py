@@ -0,0 +1,39 @@
+"""
+批处理节点共用的并行执行工具
+任务都是 PIL 编解码和文件读写，这些操作会释放 GIL，统一使用线程池：
+ComfyUI 进程有多个线程并加载了 CUDA，fork 子进程有死锁风险，spawn 子进程又会重新导入 ComfyUI 主程序
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+def resolve_workers(workers: int) -> int:
+    """0 表示按 CPU 核数自动选择"""
+    if workers <= 0:
+        return os.cpu_count() or 1
+    return workers
+
+
+def run_tasks(func, tasks, workers: int = 1):
+    """
+    执行 func(task)，按完成顺序产出 (序号, 结果, 异常)
+    workers <= 1 时在当前线程串行执行，否则在线程池中执行
+    """
+    tasks = list(tasks)
+    if workers <= 1 or len(tasks) <= 1:
+        for index, task in enumerate(tasks):
+            try:
+                yield index, func(task), None
+            except Exception as e:
+                yield index, None, e
+        return
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pd_batch") as pool:
+        futures = {pool.submit(func, task): index for index, task in enumerate(tasks)}
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                yield index, future.result(), None
+            except Exception as e:
+                yield index, None, e
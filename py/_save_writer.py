@@ -0,0 +1,155 @@
+"""
+保存类节点共用的元数据、批量编码和后台写入线程池
+PNG 元数据每次执行只序列化一次，整批各帧共用同一个 PngInfo；编码参数由保存档位（fast/balanced/archival）决定。
+同步保存时整批张量一次转换为 uint8，各帧在线程池中并行编码（PNG/JPEG/WebP 编码会释放 GIL），按原顺序返回结果。
+开启异步保存后，节点在当前线程完成张量转换和文件名分配，PNG/JPEG/WebP 编码与写盘交给后台线程，节点立即返回。
+排队中的写入数量有上限，写盘跟不上生成速度时提交会阻塞，帧数据不会无限堆积在内存里。
+进程退出前 ThreadPoolExecutor 会等待已提交的写入完成
+"""
+
+import json
+import os
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import torch
+from PIL.PngImagePlugin import PngInfo
+
+from ._file_counter import discard_placeholder, note_own_change
+from ._image_ops import SAVE_PROFILES, save_atomic, save_options
+from ._parallel import resolve_workers
+
+# 节点下拉框中的保存档位
+SAVE_PROFILE_NAMES = list(SAVE_PROFILES)
+
+# 每个写入线程允许排队的帧数
+PENDING_PER_WORKER = 4
+
+
+def png_metadata(prompt=None, extra_pnginfo=None, compress=False):
+    """
+    序列化 prompt 和 extra_pnginfo，返回整批各帧共用的 PngInfo（保存时只读取，多线程共用也安全）
+    compress 时写入 zlib 压缩的 zTXt 块，读取 img.info 得到的内容与未压缩时相同
+    """
+    metadata = PngInfo()
+    if prompt is not None:
+        metadata.add_text("prompt", json.dumps(prompt), zip=compress)
+    if extra_pnginfo is not None:
+        for key in extra_pnginfo:
+            metadata.add_text(key, json.dumps(extra_pnginfo[key]), zip=compress)
+    return metadata
+
+
+def to_uint8_batch(images):
+    """
+    整批 [B, H, W, C] 浮点张量一次转换为 uint8 numpy 数组
+    在张量所在设备上完成缩放和截断，与逐帧 np.clip(255. * x, 0, 255).astype(np.uint8) 结果相同，传回 CPU 的数据量只有 1/4
+    """
+    with torch.no_grad():
+        return (images * 255.).clamp_(0, 255).to(torch.uint8).cpu().numpy()
+
+
+def save_frames(frames, workers=0):
+    """
+    并行保存多帧，frames 为 [(PIL图像, 路径, 保存参数), ...]
+    返回与 frames 顺序一致的异常列表，成功的帧为 None；workers <= 1 或只有一帧时在当前线程串行保存
+    """
+    def save_one(frame):
+        image, path, save_kwargs = frame
+        try:
+            image.save(path, **save_kwargs)
+        except Exception as e:
+            return e
+        return None
+
+    workers = min(resolve_workers(workers), len(frames))
+    if workers <= 1:
+        return [save_one(frame) for frame in frames]
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pd_encode") as pool:
+        return list(pool.map(save_one, frames))
+
+
+class BackgroundWriter:
+    """有界的后台写入线程池，记录写入数量和失败信息，flush() 作为写入屏障"""
+
+    def __init__(self, workers=0):
+        self.workers = resolve_workers(workers)
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pd_save")
+        self._slots = threading.BoundedSemaphore(self.workers * PENDING_PER_WORKER)
+        self._done = threading.Condition()
+        self._pending_paths = Counter()
+        self._written = 0
+        self._errors = []
+
+    def save(self, image, path, **save_kwargs):
+        """提交一帧写入；先写临时文件再替换，写到一半的图片不会出现在输出目录里"""
+        self._slots.acquire()
+        with self._done:
+            self._pending_paths[path] += 1
+        try:
+            self._pool.submit(self._run, image, path, save_kwargs)
+        except BaseException:
+            self._finish(path)
+            raise
+
+    def _run(self, image, path, save_kwargs):
+        try:
+            save_atomic(image, path, **save_kwargs)
+        except Exception as e:
+            print(f"PD 后台保存失败: {path}: {e}")
+            discard_placeholder(path)
+            with self._done:
+                self._errors.append((path, e))
+        else:
+            # 临时文件改名会改变目录 mtime，告知计数器这是本进程的改动
+            note_own_change(os.path.dirname(path))
+            with self._done:
+                self._written += 1
+        finally:
+            self._finish(path)
+
+    def _finish(self, path):
+        with self._done:
+            self._pending_paths[path] -= 1
+            if not self._pending_paths[path]:
+                del self._pending_paths[path]
+            self._done.notify_all()
+        self._slots.release()
+
+    def flush(self, timeout=None):
+        """
+        等待已提交的写入全部完成，timeout 为 None 时一直等待
+        返回 (是否全部完成, 上次 flush 以来写入的数量, 失败列表)，并清空统计
+        """
+        with self._done:
+            finished = self._done.wait_for(lambda: not self._pending_paths, timeout)
+            written, self._written = self._written, 0
+            errors, self._errors = self._errors, []
+        return finished, written, errors
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer(workers=0):
+    """取得共用的后台写入线程池；线程数变化时先等待旧线程池写完再重建"""
+    global _writer
+    workers = resolve_workers(workers)
+    with _writer_lock:
+        if _writer is not None and _writer.workers != workers:
+            # 统计数据转移到新线程池，flush 节点仍能报告之前的写入结果
+            _, written, errors = _writer.flush()
+            _writer._pool.shutdown(wait=True)
+            _writer = BackgroundWriter(workers)
+            _writer._written, _writer._errors = written, errors
+        elif _writer is None:
+            _writer = BackgroundWriter(workers)
+        return _writer
+
+
+def current_writer():
+    """已创建的后台写入线程池，没有开启过异步保存时返回 None"""
+    return _writer
+
@@ -4,6 +4,10 @@ import numpy as np
 from PIL import Image
 import random
 
+from ._image_loading import STORAGE_DTYPES, iter_decoded_pairs, pixels_to_tensor
+from ._parallel import resolve_workers
+from ._pairing import match_pairs
+
 class PDimage_dual_batch_v1:
     @classmethod
     def INPUT_TYPES(cls):
@@ -41,6 +45,25 @@ class PDimage_dual_batch_v1:
                     "label_on": "仅第一张",
                     "label_off": "全部"
                 })
+            },
+            "optional": {
+                "pixel_storage": (STORAGE_DTYPES, {
+                    "default": "float32"
+                }),
+                "decode_workers": ("INT", {
+                    "default": 1,
+                    "min": 0,
+                    "max": 256,
+                    "step": 1,
+                    "display": "number"
+                }),
+                "prefetch_depth": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 4096,
+                    "step": 1,
+                    "display": "number"
+                }),
             }
         }
     
@@ -76,87 +99,37 @@ class PDimage_dual_batch_v1:
             name2_suffix: 文件夹2的标识符，如 "R" （可以是前缀、后缀或中间部分）
         
         Returns:
-            匹配的文件对列表 [(文件1, 文件2, 基础名称, 匹配类型), ...]
+            (匹配的文件对列表 [(文件1, 文件2, 基础名称, 匹配类型), ...], 文件夹1未匹配的文件, 文件夹2未匹配的文件)
         
         匹配示例：
             - 后缀匹配：65_T 对应 65_R
             - 前缀匹配：T1_00001 对应 R1_00001
             - 中间匹配：65_T_00001 对应 65_R_00001
-        """
-        matches = []
-        matched_folder2 = set()  # 记录folder2中已匹配的文件，避免重复匹配
         
-        # 如果两个标识符都为空，使用完全匹配模式
-        if not name1_suffix and not name2_suffix:
-            for name in folder1_dict:
-                if name in folder2_dict:
-                    matches.append((folder1_dict[name], folder2_dict[name], name, "完全匹配"))
-            matches.sort(key=lambda x: x[2])
-            return matches
-        
-        # 智能匹配模式：同时尝试多种匹配方式
-        for name1, full_name1 in folder1_dict.items():
-            found_match = False
-            
-            # 策略1：后缀匹配（最常见）- 例如：65_T 对应 65_R
-            if not found_match and name1_suffix:
-                # 尝试 _T 格式
-                if name1.endswith(f"_{name1_suffix}"):
-                    base_name = name1[:-len(f"_{name1_suffix}")]
-                    target_name = f"{base_name}_{name2_suffix}"
-                    if target_name in folder2_dict and target_name not in matched_folder2:
-                        matches.append((full_name1, folder2_dict[target_name], base_name, "后缀匹配(_)"))
-                        matched_folder2.add(target_name)
-                        found_match = True
-                
-                # 尝试不带下划线的后缀格式：例如 65T 对应 65R
-                if not found_match and name1.endswith(name1_suffix):
-                    base_name = name1[:-len(name1_suffix)]
-                    target_name = f"{base_name}{name2_suffix}"
-                    if target_name in folder2_dict and target_name not in matched_folder2:
-                        matches.append((full_name1, folder2_dict[target_name], base_name, "后缀匹配"))
-                        matched_folder2.add(target_name)
-                        found_match = True
-            
-            # 策略2：前缀匹配 - 例如：T1_00001 对应 R1_00001
-            if not found_match and name1_suffix:
-                # 尝试 T_ 格式
-                if name1.startswith(f"{name1_suffix}_"):
-                    base_name = name1[len(f"{name1_suffix}_"):]
-                    target_name = f"{name2_suffix}_{base_name}"
-                    if target_name in folder2_dict and target_name not in matched_folder2:
-                        matches.append((full_name1, folder2_dict[target_name], base_name, "前缀匹配(_)"))
-                        matched_folder2.add(target_name)
-                        found_match = True
-                
-                # 尝试不带下划线的前缀格式：例如 T1_00001 对应 R1_00001
-                if not found_match and name1.startswith(name1_suffix):
-                    base_name = name1[len(name1_suffix):]
-                    target_name = f"{name2_suffix}{base_name}"
-                    if target_name in folder2_dict and target_name not in matched_folder2:
-                        matches.append((full_name1, folder2_dict[target_name], base_name, "前缀匹配"))
-                        matched_folder2.add(target_name)
-                        found_match = True
-            
-            # 策略3：中间位置匹配 - 例如：65_T_00001 对应 65_R_00001
-            if not found_match and name1_suffix and name2_suffix:
-                # 尝试替换所有出现的标识符
-                if f"_{name1_suffix}_" in name1:
-                    target_name = name1.replace(f"_{name1_suffix}_", f"_{name2_suffix}_")
-                    if target_name in folder2_dict and target_name not in matched_folder2:
-                        base_name = name1.replace(f"_{name1_suffix}_", "_")
-                        matches.append((full_name1, folder2_dict[target_name], base_name, "中间匹配"))
-                        matched_folder2.add(target_name)
-                        found_match = True
-        
-        matches.sort(key=lambda x: x[2])
-        return matches
+        每个文件名只规范化一次（去掉任意位置的标识符得到基础名称），两侧建立字典索引后 O(n) 配对
+        """
+        pairs, unmatched1, unmatched2 = match_pairs(
+            list(folder1_dict), list(folder2_dict), name1_suffix, name2_suffix
+        )
+        matches = [
+            (folder1_dict[name1], folder2_dict[name2], base_name, match_type)
+            for name1, name2, base_name, match_type in pairs
+        ]
+        unmatched1 = [folder1_dict[name] for name in unmatched1]
+        unmatched2 = [folder2_dict[name] for name in unmatched2]
+        return matches, unmatched1, unmatched2
     
-    def pil_to_tensor(self, image):
-        """PIL图片转张量 - 确保正确的格式和数据类型"""
+    def pil_to_tensor(self, image, storage="float32"):
+        """PIL图片转张量 - 确保正确的格式和数据类型
+        
+        storage 为 float16 时以半精度保存像素（仍为 0-1）
+        """
         if image.mode != 'RGB':
             image = image.convert('RGB')
         
+        if storage != "float32":
+            return pixels_to_tensor(np.array(image), storage)
+        
         # 转换为numpy数组，确保数据类型
         np_image = np.array(image, dtype=np.float32) / 255.0
         
@@ -171,11 +144,18 @@ class PDimage_dual_batch_v1:
         
         return tensor
 
-    def load_matched_images(self, image1_path, image2_path, name1_suffix, name2_suffix, seed, only_first):
+    def load_image(self, image_path, storage="float32"):
+        """打开并转换单张图片，供解码线程调用"""
+        with Image.open(image_path) as img:
+            return self.pil_to_tensor(img, storage)
+
+    def load_matched_images(self, image1_path, image2_path, name1_suffix, name2_suffix, seed, only_first, pixel_storage="float32", decode_workers=1, prefetch_depth=0):
         """主处理函数 - 真正的List输出模式，保留所有匹配图片
         
         Args:
             only_first: 是否只读取第一张匹配的图片对（用于测试）
+            decode_workers: 解码线程数，0 为按 CPU 核数自动选择，1 为在主线程中依次解码
+            prefetch_depth: 最多提前解码的图片对数，0 为与线程数相同
         """
         try:
             # 确保种子在有效范围内
@@ -202,7 +182,9 @@ class PDimage_dual_batch_v1:
             if not folder1_dict or not folder2_dict:
                 raise ValueError("文件夹中没有找到图片文件")
             
-            matches = self.find_matching_pairs(folder1_dict, folder2_dict, name1_suffix, name2_suffix)
+            matches, unmatched1, unmatched2 = self.find_matching_pairs(folder1_dict, folder2_dict, name1_suffix, name2_suffix)
+            if unmatched1 or unmatched2:
+                print(f"未匹配: 文件夹1 {len(unmatched1)} 个, 文件夹2 {len(unmatched2)} 个")
             
             if not matches:
                 raise ValueError("没有找到匹配的图片对")
@@ -221,17 +203,28 @@ class PDimage_dual_batch_v1:
             size_info = {}
             match_type_info = {}
             
-            for file1, file2, base_name, match_type in matches:
-                try:
-                    img1_path = os.path.join(image1_path, file1)
-                    img2_path = os.path.join(image2_path, file2)
-                    
-                    img1 = Image.open(img1_path)
-                    img2 = Image.open(img2_path)
+            # decode_workers > 1 时两侧图片在线程池中同时解码，结果仍按配对顺序返回
+            workers = resolve_workers(decode_workers)
+            if workers > 1:
+                print(f"并行解码: {workers} 个线程，预取深度 {prefetch_depth or workers} 对")
+            
+            pair_paths = [
+                (os.path.join(image1_path, file1), os.path.join(image2_path, file2))
+                for file1, file2, _, _ in matches
+            ]
+            decoded = iter_decoded_pairs(
+                pair_paths,
+                decode=lambda path: self.load_image(path, pixel_storage),
+                workers=workers,
+                prefetch=prefetch_depth,
+            )
+            try:
+                for (_, _, base_name, match_type), (_, result, error) in zip(matches, decoded):
+                    if error is not None:
+                        print(f"加载图片 {base_name} 失败: {str(error)}")
+                        continue
                     
-                    # 确保正确转换为张量
-                    tensor1 = self.pil_to_tensor(img1)
-                    tensor2 = self.pil_to_tensor(img2)
+                    tensor1, tensor2 = result
                     
                     # 添加batch维度 (H, W, C) -> (1, H, W, C)
                     tensor1_batch = tensor1.unsqueeze(0)
@@ -252,10 +245,8 @@ class PDimage_dual_batch_v1:
                     match_type_info[match_type] = match_type_info.get(match_type, 0) + 1
                     
                     match_info.append(f"{base_name} [{match_type}]: {tensor1_batch.shape} + {tensor2_batch.shape}")
-                    
-                except Exception as e:
-                    print(f"加载图片 {base_name} 失败: {str(e)}")
-                    continue
+            finally:
+                decoded.close()
             
             if not batch1_list:
                 raise ValueError("没有成功加载任何图片对")
@@ -291,6 +282,12 @@ class PDimage_dual_batch_v1:
             info_text += f"图片2列表长度: {len(batch2_list)}\n"
             info_text += f"路径1: {image1_path}\n"
             info_text += f"路径2: {image2_path}\n"
+            info_text += f"未匹配: 文件夹1 {len(unmatched1)} 个, 文件夹2 {len(unmatched2)} 个\n"
+            for label, unmatched in (("文件夹1未匹配", unmatched1), ("文件夹2未匹配", unmatched2)):
+                if unmatched:
+                    shown = ", ".join(unmatched[:20])
+                    more = f" ... 还有 {len(unmatched) - 20} 个" if len(unmatched) > 20 else ""
+                    info_text += f"  - {label}: {shown}{more}\n"
             info_text += "\n匹配详情:\n" + "\n".join(match_info)
             
             # 返回List格式 - ComfyUI会识别OUTPUT_IS_LIST标志
@@ -1,9 +1,9 @@
 import os
-import re
-import torch
-import numpy as np
-from PIL import Image, ImageOps
-from typing import List, Tuple
+from functools import partial
+from typing import List
+
+from ._dir_index import list_image_files
+from ._image_loading import STORAGE_DTYPES, iter_decoded, load_image_tensor, resolve_workers
 
 class Load_Images_V1:
     """
@@ -43,14 +43,43 @@ class Load_Images_V1:
                 "sort_method": (["numeric", "alphabetic", "natural"], {
                     "default": "numeric"
                 }),
+                "decode_workers": ("INT", {
+                    "default": 1,
+                    "min": 0,
+                    "max": 256,
+                    "step": 1,
+                    "display": "number"
+                }),
+                "prefetch_depth": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 4096,
+                    "step": 1,
+                    "display": "number"
+                }),
+                "use_decode_cache": ("BOOLEAN", {
+                    "default": False
+                }),
+                "pixel_storage": (STORAGE_DTYPES, {
+                    "default": "float32"
+                }),
+                "max_side": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 16384,
+                    "step": 8,
+                    "display": "number"
+                }),
             }
         }
 
-    RETURN_TYPES = ("IMAGE", "MASK", "STRING")
-    RETURN_NAMES = ("images", "masks", "file_paths")
+    # next_index / total_files / has_more 用于分页：把 image_load_cap 当作每页数量，
+    # 将 next_index 接回 start_index 即可按页遍历大目录，内存只占用一页
+    RETURN_TYPES = ("IMAGE", "MASK", "STRING", "INT", "INT", "BOOLEAN")
+    RETURN_NAMES = ("images", "masks", "file_paths", "next_index", "total_files", "has_more")
     FUNCTION = "load_images_recursive"
     CATEGORY = "PD_Image/Loading"
-    OUTPUT_IS_LIST = (True, True, True)
+    OUTPUT_IS_LIST = (True, True, True, False, False, False)
 
     @classmethod
     def IS_CHANGED(cls, **kwargs):
@@ -59,87 +88,21 @@ class Load_Images_V1:
         else:
             return hash(frozenset(kwargs))
 
-    def numeric_sort_key(self, file_path: str) -> Tuple[int, str]:
-        """
-        数字排序键：专门处理纯数字文件名，如 1.jpg, 2.jpg, 10.jpg, 100.jpg
-        """
-        filename = os.path.basename(file_path)
-        name, ext = os.path.splitext(filename)
-        
-        # 尝试提取文件名中的数字
-        numbers = re.findall(r'\d+', name)
-        if numbers:
-            # 如果找到数字，使用第一个数字作为主要排序键
-            return (int(numbers[0]), filename)
-        else:
-            # 如果没有数字，使用文件名作为次要排序键
-            return (0, filename)
-
-    def natural_sort_key(self, file_path: str) -> List:
-        """
-        自然排序键：智能处理数字和字母混合的文件名
-        """
-        filename = os.path.basename(file_path)
-        # 将文件名分割成数字和非数字部分
-        parts = re.split(r'(\d+)', filename)
-        result = []
-        for part in parts:
-            if part.isdigit():
-                result.append(int(part))
-            else:
-                result.append(part.lower())
-        return result
-
     def get_all_image_files(self, directory: str, sort_method: str = "numeric") -> List[str]:
         """
         递归获取目录及其子目录中的所有图片文件，按指定方式排序
         特别优化了数字文件名的排序：1.jpg, 2.jpg, ..., 100.jpg
+        使用增量目录索引，只重新扫描 mtime 变化过的目录
         """
-        valid_extensions = ['.jpg', '.jpeg', '.png', '.webp', '.bmp', '.tiff', '.gif']
-        image_files = []
-        searched_dirs = []
-        
         print(f"开始递归搜索图片文件，根目录: {directory}")
         print(f"排序方式: {sort_method}")
-        
-        for root, dirs, files in os.walk(directory):
-            searched_dirs.append(root)
-            print(f"正在搜索目录: {root}")
-            
-            image_count_in_dir = 0
-            for file in files:
-                if any(file.lower().endswith(ext) for ext in valid_extensions):
-                    full_path = os.path.join(root, file)
-                    image_files.append(full_path)
-                    image_count_in_dir += 1
-            
-            if image_count_in_dir > 0:
-                print(f"  在目录 {root} 中找到 {image_count_in_dir} 张图片")
-            
-            if dirs:
-                print(f"  发现 {len(dirs)} 个子文件夹: {dirs}")
-        
+
+        image_files, dir_count, rescanned = list_image_files(directory, sort_method)
+
         print(f"搜索完成！")
-        print(f"总共搜索了 {len(searched_dirs)} 个目录")
+        print(f"总共搜索了 {dir_count} 个目录（重新扫描 {rescanned} 个）")
         print(f"找到 {len(image_files)} 张图片")
         
-        # 根据选择的排序方法进行排序
-        if sort_method == "numeric":
-            # 数字排序：专门处理 1.jpg, 2.jpg, 10.jpg, 100.jpg 这样的文件名
-            image_files.sort(key=self.numeric_sort_key)
-            print("使用数字排序：纯数字文件名按数值大小排序")
-        elif sort_method == "alphabetic":
-            # 字母排序：传统的字符串排序
-            image_files.sort(key=lambda x: os.path.basename(x).lower())
-            print("使用字母排序：按字符串顺序排序")
-        elif sort_method == "natural":
-            # 自然排序：处理混合的数字和字母
-            image_files.sort(key=self.natural_sort_key)
-            print("使用自然排序：智能处理数字和字母混合")
-        else:
-            # 默认使用数字排序
-            image_files.sort(key=self.numeric_sort_key)
-        
         print(f"排序完成，前10个文件:")
         for i, file_path in enumerate(image_files[:10]):
             filename = os.path.basename(file_path)
@@ -147,7 +110,7 @@ class Load_Images_V1:
         
         return image_files
 
-    def load_images_recursive(self, directory: str, image_load_cap: int = 0, start_index: int = 0, load_always=False, sort_method: str = "numeric"):
+    def load_images_recursive(self, directory: str, image_load_cap: int = 0, start_index: int = 0, load_always=False, sort_method: str = "numeric", decode_workers: int = 1, prefetch_depth: int = 0, use_decode_cache: bool = False, pixel_storage: str = "float32", max_side: int = 0):
         """
         递归加载目录及其子目录中的所有图片，按数字顺序排序
         """
@@ -170,6 +133,7 @@ class Load_Images_V1:
         print(f"Files sorted by: {sort_method}")
 
         # 应用起始索引
+        total_files = len(all_image_files)
         all_image_files = all_image_files[start_index:]
 
         images = []
@@ -178,49 +142,51 @@ class Load_Images_V1:
 
         limit_images = image_load_cap > 0
         image_count = 0
-
-        for image_path in all_image_files:
-            if limit_images and image_count >= image_load_cap:
-                break
-                
-            try:
-                # 加载图片
-                i = Image.open(image_path)
-                i = ImageOps.exif_transpose(i)
-                image = i.convert("RGB")
-                
-                # 转换为张量格式 [B, H, W, C]
-                image = np.array(image).astype(np.float32) / 255.0
-                image = torch.from_numpy(image)[None,]  # 添加batch维度
-
-                # 处理透明通道作为遮罩 [B, H, W]
-                if 'A' in i.getbands():
-                    mask = np.array(i.getchannel('A')).astype(np.float32) / 255.0
-                    mask = 1. - torch.from_numpy(mask)  # 反转遮罩
-                else:
-                    # 如果没有透明通道，创建默认遮罩
-                    height, width = image.shape[1], image.shape[2]
-                    mask = torch.zeros((height, width), dtype=torch.float32, device="cpu")
-
+        # 已消耗的文件数（包括加载失败被跳过的），用于计算下一页的起始索引
+        consumed = 0
+
+        # decode_workers > 1 时在线程池中解码，结果仍按排序后的顺序返回
+        workers = resolve_workers(decode_workers)
+        if workers > 1:
+            print(f"并行解码: {workers} 个线程，预取深度 {prefetch_depth or workers * 2}")
+
+        # use_decode_cache 为 True 时复用磁盘上已解码的结果，文件未改动就不再重新解码
+        # pixel_storage 为 float16 时以半精度保存像素
+        # max_side > 0 时最长边缩小到 max_side，JPEG 直接按 1/2、1/4、1/8 降采样解码
+        decode = partial(load_image_tensor, use_cache=use_decode_cache, storage=pixel_storage, max_side=max_side)
+        decoded = iter_decoded(all_image_files, decode=decode, workers=workers, prefetch=prefetch_depth)
+        try:
+            for image_path, result, error in decoded:
+                consumed += 1
+                if error is not None:
+                    print(f"Error loading image {image_path}: {error}")
+                    continue
+
+                image, mask = result
                 images.append(image)
                 masks.append(mask)
                 file_paths.append(str(image_path))
                 image_count += 1
-                
+
                 # 输出加载进度
                 if image_count % 10 == 0:
                     print(f"Loaded {image_count} images...")
-                    
-            except Exception as e:
-                print(f"Error loading image {image_path}: {e}")
-                continue
+
+                if limit_images and image_count >= image_load_cap:
+                    break
+        finally:
+            decoded.close()
 
         if not images:
             raise ValueError("No valid images could be loaded from the directory and its subdirectories.")
 
         print(f"Successfully loaded {len(images)} images")
         print(f"排序方式: {sort_method} - 确保数字文件名按正确顺序加载")
-        return (images, masks, file_paths)
+        next_index = start_index + consumed
+        has_more = next_index < total_files
+        if limit_images:
+            print(f"分页: 本页 {start_index} - {next_index - 1}，共 {total_files} 个文件，下一页起始索引 {next_index}")
+        return (images, masks, file_paths, next_index, total_files, has_more)
 
 
 # 节点映射配置
@@ -1,4 +1,5 @@
 import numpy as np
+import torch
 from PIL import Image
 from scipy.ndimage import label
 
@@ -30,43 +31,56 @@ class mask_edge_selector:
         if isinstance(image, Image.Image):
             image = np.array(image.convert("RGBA"))
 
+        # ComfyUI 的 IMAGE 为 0-1 浮点；uint8 输入（PIL 图像等）统一换算到 0-1
+        image = np.asarray(image)
+        if image.dtype == np.uint8:
+            image = image.astype(np.float32) / 255.0
+        else:
+            image = image.astype(np.float32, copy=False)
+
+        # [B, H, W, C] 批次逐帧处理，单张图片视为只有一帧的批次
+        frames = image if image.ndim == 4 else image[None, ...]
+        results = [self._select_frame(frame, mode) for frame in frames]
+
+        # 按 ComfyUI 的布局输出：IMAGE [B, H, W, 3]、MASK [B, H, W]，均为 0-1 浮点张量
+        result_image = torch.from_numpy(np.stack([r[0] for r in results]))
+        result_mask = torch.from_numpy(np.stack([r[1] for r in results]))
+        mask_image = result_mask[..., None].expand(-1, -1, -1, 3).contiguous()
+
+        return (result_image, result_mask, mask_image)
+
+    def _select_frame(self, image, mode):
+        """单帧（0-1 浮点）：返回 (区域图像 [H, W, 3] float32, 区域遮罩 [H, W] float32)"""
         if image.ndim == 3 and image.shape[-1] == 4:
             image_rgb = image[..., :3]
             alpha = image[..., 3]
             mask = (alpha == 0).astype(np.uint8)
         else:
             image_rgb = image if image.ndim == 3 else np.stack([image] * 3, axis=-1)
-            gray = np.mean(image_rgb, axis=-1).astype(np.uint8)
-            mask = (gray == 0).astype(np.uint8)
+            # 灰度换算到 0-255 后取整为 0 的像素视为背景
+            gray = np.mean(image_rgb, axis=-1) * 255.0
+            mask = (gray < 1.0).astype(np.uint8)
 
         seg, num_labels = label(mask)
 
         if num_labels == 0:
-            result_mask = np.zeros_like(mask, dtype=np.float32)
+            result_mask = np.zeros(mask.shape, dtype=np.float32)
             result_mask[0:1, 0:1] = 1.0
-            result_image = np.zeros_like(image_rgb, dtype=np.uint8)
+            result_image = np.zeros(image_rgb.shape, dtype=np.float32)
         else:
-            areas = [(seg == i).sum() for i in range(1, num_labels + 1)]
+            # 一次 bincount 统计所有区域面积，不再逐个标签扫描整张图
+            areas = np.bincount(seg.ravel(), minlength=num_labels + 1)[1:]
             target_index = np.argmax(areas) + 1 if mode == "max" else np.argmin(areas) + 1
 
-            selected_mask = (seg == target_index).astype(np.uint8)
+            selected_mask = seg == target_index
 
-            result_image = np.zeros_like(image_rgb, dtype=np.uint8)
-            for c in range(3):
-                result_image[..., c][selected_mask == 1] = image_rgb[..., c][selected_mask == 1]
+            result_image = np.where(selected_mask[..., None], image_rgb, 0).astype(np.float32)
 
-            result_mask = (selected_mask > 0).astype(np.float32)
-            if result_mask.sum() == 0:
+            result_mask = selected_mask.astype(np.float32)
+            if not selected_mask.any():
                 result_mask[0:1, 0:1] = 1.0
 
-        result_mask_array = result_mask[None, None, ...].astype(np.float32)  # (1, 1, H, W)
-        result_image_array = result_image.transpose(2, 0, 1)[None, ...].astype(np.uint8)  # (1, 3, H, W)
-
-        mask_rgb = (result_mask * 255).astype(np.uint8)
-        mask_rgb = np.stack([mask_rgb] * 3, axis=-1)
-        mask_rgb_array = mask_rgb.transpose(2, 0, 1)[None, ...].astype(np.uint8)
-
-        return (result_image_array, result_mask_array, mask_rgb_array)
+        return result_image, result_mask
 
 NODE_CLASS_MAPPINGS = {
     "mask_edge_selector": mask_edge_selector
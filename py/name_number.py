@@ -2,6 +2,9 @@ import os
 import comfy.utils
 from PIL import Image
 
+from ._image_loading import draft_for_max_side
+from ._save_writer import SAVE_PROFILE_NAMES, save_options
+
 class PD_number_star:
     """
     文件批量重命名节点
@@ -21,6 +24,9 @@ class PD_number_star:
                 "padding": ("INT", {"default": 1, "min": 0, "max": 9, "step": 1}),  # 数字填充位数
                 "format_convert": (["NONE", "jpg", "png", "txt"], {"default": "不修改"}),  # 格式转换
                 "max_size": ("INT", {"default": 1024, "min": 64, "max": 4096, "step": 64}),  # 图片最长边
+            },
+            "optional": {
+                "save_profile": (SAVE_PROFILE_NAMES, {"default": "balanced"}),  # 编码档位：fast速度优先，balanced折中，archival归档(PNG最小,JPEG色度完整更大)
             }
         }
     
@@ -29,7 +35,7 @@ class PD_number_star:
     FUNCTION = "rename_files"
     CATEGORY = "ZHO Tools"
 
-    def rename_files(self, folder_path, new_name="", prefix="", delimiter="_", number_start=False, padding=1, format_convert="不修改", max_size=1024):
+    def rename_files(self, folder_path, new_name="", prefix="", delimiter="_", number_start=False, padding=1, format_convert="不修改", max_size=1024, save_profile="balanced"):
         """
         重命名文件夹中的文件
         
@@ -42,6 +48,7 @@ class PD_number_star:
             padding (int): 数字填充位数
             format_convert (str): 格式转换选项
             max_size (int): 图片最长边尺寸
+            save_profile (str): 编码档位（fast/balanced/archival）
             
         Returns:
             tuple: 包含操作结果的字符串
@@ -122,7 +129,7 @@ class PD_number_star:
                     
                     if needs_image_processing:
                         # 处理图片格式转换和尺寸调整
-                        self._process_image(file_path, new_path, format_convert, max_size, original_ext)
+                        self._process_image(file_path, new_path, format_convert, max_size, original_ext, save_profile)
                     else:
                         # 普通文件重命名
                         os.rename(file_path, new_path)
@@ -171,7 +178,7 @@ class PD_number_star:
         _, ext = os.path.splitext(file_path)
         return ext.lower() in image_extensions
     
-    def _process_image(self, input_path, output_path, format_convert, max_size, original_ext):
+    def _process_image(self, input_path, output_path, format_convert, max_size, original_ext, save_profile="balanced"):
         """
         处理图片：调整尺寸和格式转换
         
@@ -181,10 +188,14 @@ class PD_number_star:
             format_convert (str): 目标格式
             max_size (int): 最长边尺寸
             original_ext (str): 原始扩展名
+            save_profile (str): 编码档位，决定压缩级别、optimize 和 JPEG 色度采样
         """
         try:
             # 打开图片
             with Image.open(input_path) as img:
+                # JPEG 直接按 1/2、1/4、1/8 缩小解码，省去全尺寸解码的时间和内存
+                source_size = draft_for_max_side(img, max_size)
+                
                 # 转换为RGB模式（适用于JPG）
                 if format_convert == "jpg" and img.mode in ('RGBA', 'LA', 'P'):
                     # 创建白色背景
@@ -196,16 +207,17 @@ class PD_number_star:
                 
                 # 调整图片尺寸
                 if max_size > 0:
-                    img = self._resize_image(img, max_size)
+                    img = self._resize_image(img, max_size, source_size)
                 
                 # 保存图片
                 if format_convert == "jpg":
-                    img.save(output_path, 'JPEG', quality=95, optimize=True)
+                    img.save(output_path, 'JPEG', quality=95, **save_options("JPEG", save_profile))
                 elif format_convert == "png":
-                    img.save(output_path, 'PNG', optimize=True)
+                    img.save(output_path, 'PNG', **save_options("PNG", save_profile))
                 else:
                     # 保持原格式但调整尺寸
-                    img.save(output_path, optimize=True)
+                    image_format = Image.registered_extensions().get(os.path.splitext(output_path)[1].lower())
+                    img.save(output_path, **save_options(image_format, save_profile))
             
             # 删除原文件（如果路径不同）
             if input_path != output_path:
@@ -216,18 +228,19 @@ class PD_number_star:
             print(f"图片处理失败，回退到普通重命名: {e}")
             os.rename(input_path, output_path)
     
-    def _resize_image(self, img, max_size):
+    def _resize_image(self, img, max_size, source_size=None):
         """
         调整图片尺寸，保持宽高比
         
         Args:
             img: PIL图片对象
             max_size (int): 最长边尺寸
+            source_size (tuple): draft 降采样解码前的原始尺寸，用于计算与全尺寸解码一致的目标尺寸
             
         Returns:
             PIL.Image: 调整后的图片
         """
-        width, height = img.size
+        width, height = source_size or img.size
         
         # 如果图片已经小于等于目标尺寸，不需要调整
         if max(width, height) <= max_size:
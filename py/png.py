@@ -10,6 +10,37 @@ def pil2tensor(image):
     """将PIL图像转换为ComfyUI图像张量"""
     return torch.from_numpy(np.array(image).astype(np.float32) / 255.0).unsqueeze(0)
 
+def _pad_symmetric(x, radius, dim):
+    """边界按 d c b a | a b c d 方式镜像填充（与 scipy.ndimage 的 reflect 模式一致）"""
+    size = x.shape[dim]
+    if size >= radius:
+        head = x.narrow(dim, 0, radius).flip(dim)
+        tail = x.narrow(dim, size - radius, radius).flip(dim)
+        return torch.cat([head, x, tail], dim)
+    # 尺寸小于半径时需要多次镜像，按周期 2*size 计算下标
+    index = torch.arange(-radius, size + radius, device=x.device) % (2 * size)
+    index = torch.where(index < size, index, 2 * size - 1 - index)
+    return x.index_select(dim, index)
+
+def gaussian_blur(mask, sigma=1.0, truncate=4.0):
+    """
+    对 [B, H, W] 掩码做可分离高斯模糊，结果与 scipy.ndimage.gaussian_filter 一致
+    每个方向把镜像填充后的错位切片加权累加，整批在张量所在设备上一起处理
+    """
+    radius = int(truncate * sigma + 0.5)
+    x = np.arange(-radius, radius + 1)
+    weights = np.exp(-0.5 / sigma ** 2 * x ** 2)
+    weights = (weights / weights.sum()).tolist()
+
+    out = mask
+    for dim in (2, 1):
+        size = out.shape[dim]
+        padded = _pad_symmetric(out, radius, dim)
+        out = padded.narrow(dim, 0, size) * weights[0]
+        for i in range(1, len(weights)):
+            out.add_(padded.narrow(dim, i, size), alpha=weights[i])
+    return out
+
 class PD_RemoveBlackBackground:
     """
     去除图像黑色背景节点
@@ -31,6 +62,7 @@ class PD_RemoveBlackBackground:
             "optional": {
                 "smooth_edges": ("BOOLEAN", {"default": True}),  # 是否平滑边缘
                 "invert_mask": ("BOOLEAN", {"default": True}),  # 是否反转掩码
+                "verbose": ("BOOLEAN", {"default": False}),  # 打印第一张图像的亮度统计（GPU 上会等待同步）
             }
         }
 
@@ -39,7 +71,7 @@ class PD_RemoveBlackBackground:
     FUNCTION = "remove_black_background"  # 指定执行的方法名称
     CATEGORY = "PDuse/Image"  # 定义节点的类别
 
-    def remove_black_background(self, image, threshold=0.9, smooth_edges=True, invert_mask=True):
+    def remove_black_background(self, image, threshold=0.9, smooth_edges=True, invert_mask=True, verbose=False):
         """
         去除图像黑色背景，分别输出掩码和原图像
         
@@ -48,6 +80,7 @@ class PD_RemoveBlackBackground:
             threshold (float): 黑色检测阈值，0.0-1.0，低于此值的像素被认为是黑色
             smooth_edges (bool): 是否平滑边缘
             invert_mask (bool): 是否反转掩码，True时黑色区域变透明，False时黑色区域保留
+            verbose (bool): 是否打印调试信息；统计值要从设备取回，图像在 GPU 上时会强制同步
             
         返回：
             image (tensor): 原始图像张量 [B, H, W, C]
@@ -59,70 +92,43 @@ class PD_RemoveBlackBackground:
         
         batch_size, height, width, channels = image.shape
         
-        # 处理每张图像生成掩码
-        result_masks = []
+        # 整批一起计算像素亮度（使用加权平均：R*0.299 + G*0.587 + B*0.114），在图像所在设备上完成
+        luma = torch.tensor([0.299, 0.587, 0.114], dtype=torch.float32, device=image.device)
+        brightness = image[..., :3].float() @ luma  # [B, H, W]
         
-        for i in range(batch_size):
-            # 获取单张图像 [H, W, C]
-            single_image = image[i]
-            
-            # 计算像素亮度（使用加权平均：R*0.299 + G*0.587 + B*0.114）
-            rgb = single_image.cpu().numpy()
-            brightness = np.dot(rgb, [0.299, 0.587, 0.114])
-            
-            # 调试信息：显示亮度统计
-            if i == 0:  # 只为第一张图像打印调试信息
-                min_brightness = brightness.min()
-                max_brightness = brightness.max()
-                mean_brightness = brightness.mean()
-                print(f"🔍 图像亮度分析:")
-                print(f"   最暗像素: {min_brightness:.3f}")
-                print(f"   最亮像素: {max_brightness:.3f}") 
-                print(f"   平均亮度: {mean_brightness:.3f}")
-                print(f"   当前阈值: {threshold:.3f}")
-                print(f"   反转掩码: {'开启' if invert_mask else '关闭'}")
-                print(f"   保留区域: {'亮色区域' if invert_mask else '暗色区域'}")
-            
-            # 创建黑色像素掩码：亮度低于阈值的像素被认为是黑色背景
-            black_mask = brightness < threshold
-            
-            # 调试信息：显示检测结果
-            if i == 0:
-                black_pixel_count = black_mask.sum()
-                total_pixels = black_mask.size
-                black_percentage = (black_pixel_count / total_pixels) * 100
-                preserved_percentage = black_percentage if not invert_mask else (100 - black_percentage)
-                print(f"   检测到暗色像素: {black_pixel_count}/{total_pixels} ({black_percentage:.1f}%)")
-                print(f"   最终保留区域: {preserved_percentage:.1f}%")
-            
-            # 如果需要平滑边缘，对掩码进行轻微模糊处理
-            if smooth_edges:
-                try:
-                    from scipy.ndimage import gaussian_filter
-                    # 对掩码进行高斯模糊以平滑边缘
-                    smoothed_mask = gaussian_filter(black_mask.astype(np.float32), sigma=1.0)
-                    # 保留平滑过渡
-                    black_mask = np.clip(smoothed_mask, 0, 1)
-                except ImportError:
-                    # 如果scipy不可用，则使用硬边模式
-                    black_mask = black_mask.astype(np.float32)
-            else:
-                black_mask = black_mask.astype(np.float32)
-            
-            # 创建alpha掩码：1表示保留（不透明），0表示透明
-            if invert_mask:
-                # 反转掩码：保留非黑色区域（亮色区域）
-                alpha_mask = 1.0 - black_mask
-            else:
-                # 直接使用掩码：保留黑色区域（暗色区域）
-                alpha_mask = black_mask
-            
-            # 转换为张量格式 [H, W]
-            mask_tensor = torch.from_numpy(alpha_mask).float()
-            result_masks.append(mask_tensor)
+        # 创建黑色像素掩码：亮度低于阈值的像素被认为是黑色背景
+        black_mask = (brightness < threshold).float()
+        
+        if verbose:
+            # 调试信息：显示亮度统计和检测结果（只为第一张图像打印），一次取回 CPU
+            first_min, first_max, first_mean, black_pixel_count = torch.stack([
+                brightness[0].min(), brightness[0].max(), brightness[0].mean(), black_mask[0].sum()
+            ]).tolist()
+            black_pixel_count = int(black_pixel_count)
+            total_pixels = height * width
+            black_percentage = (black_pixel_count / total_pixels) * 100
+            preserved_percentage = black_percentage if not invert_mask else (100 - black_percentage)
+            print(f"🔍 图像亮度分析:")
+            print(f"   最暗像素: {first_min:.3f}")
+            print(f"   最亮像素: {first_max:.3f}")
+            print(f"   平均亮度: {first_mean:.3f}")
+            print(f"   当前阈值: {threshold:.3f}")
+            print(f"   反转掩码: {'开启' if invert_mask else '关闭'}")
+            print(f"   保留区域: {'亮色区域' if invert_mask else '暗色区域'}")
+            print(f"   检测到暗色像素: {black_pixel_count}/{total_pixels} ({black_percentage:.1f}%)")
+            print(f"   最终保留区域: {preserved_percentage:.1f}%")
+        
+        # 如果需要平滑边缘，对掩码进行轻微模糊处理，保留平滑过渡
+        if smooth_edges:
+            black_mask = torch.clamp(gaussian_blur(black_mask, sigma=1.0), 0, 1)
         
-        # 堆叠所有掩码 [B, H, W]
-        final_masks = torch.stack(result_masks, dim=0)
+        # 创建alpha掩码：1表示保留（不透明），0表示透明
+        if invert_mask:
+            # 反转掩码：保留非黑色区域（亮色区域）
+            final_masks = 1.0 - black_mask
+        else:
+            # 直接使用掩码：保留黑色区域（暗色区域）
+            final_masks = black_mask
         
         return (image, final_masks)
 
@@ -2,9 +2,31 @@ import os
 import cv2
 import numpy as np
 import torch
+import torch.nn.functional as F
 from PIL import Image
 
 
+# OpenCV 不同版本的 RGB2GRAY 定点系数 (R, G, B, 位移)
+GRAY_COEFFS_CANDIDATES = ((9798, 19235, 3735, 15), (4899, 9617, 1868, 14))
+_gray_coeffs = False
+
+
+def gray_coefficients():
+    """探测当前 OpenCV 使用的 RGB2GRAY 定点系数，都不匹配时返回 None"""
+    global _gray_coeffs
+    if _gray_coeffs is False:
+        sample = np.random.default_rng(0).integers(0, 256, (64, 64, 3), dtype=np.uint8)
+        expected = cv2.cvtColor(sample, cv2.COLOR_RGB2GRAY)
+        rgb = sample.astype(np.int64)
+        _gray_coeffs = None
+        for r2y, g2y, b2y, shift in GRAY_COEFFS_CANDIDATES:
+            gray = (rgb[..., 0] * r2y + rgb[..., 1] * g2y + rgb[..., 2] * b2y + (1 << (shift - 1))) >> shift
+            if np.array_equal(gray, expected):
+                _gray_coeffs = (r2y, g2y, b2y, shift)
+                break
+    return _gray_coeffs
+
+
 class PD_RemoveWhiteBorder:
     """
     自动识别图像中所有白色区域的节点
@@ -23,6 +45,12 @@ class PD_RemoveWhiteBorder:
                     "step": 1,
                     "tooltip": "白色区域检测灵敏度，0-100，值越大检测越严格"
                 }),
+            },
+            "optional": {
+                "engine": (["opencv", "torch"], {
+                    "default": "opencv",
+                    "tooltip": "opencv 逐帧处理；torch 在图像所在设备上整批处理（适合 GPU 上的大批次），结果相同"
+                }),
             }
         }
   
@@ -31,9 +59,36 @@ class PD_RemoveWhiteBorder:
     FUNCTION = "extract_white_areas"
     CATEGORY = "PDuse/Image"
   
-    def create_white_areas_mask(self, image_array, threshold=70):
+    def denoise_params(self, height, width, threshold=70):
+        """
+        根据图像尺寸和阈值计算去噪参数，返回 (中值滤波核大小, 形态学核大小)，不去噪时返回 None
+        同一批次的图片尺寸相同，每次执行只需计算一次
+        """
+        image_size = height * width
+        
+        # 根据图像大小和阈值动态调整去噪强度
+        if image_size > 1000000:  # 大图像 (>1000x1000)
+            denoise_strength = 5
+        elif image_size > 250000:  # 中等图像 (>500x500)
+            denoise_strength = 4
+        else:  # 小图像
+            denoise_strength = 3
+            
+        # 根据阈值微调去噪强度
+        if threshold > 80:
+            denoise_strength = max(1, denoise_strength - 1)  # 高阈值时减少去噪
+        elif threshold < 50:
+            denoise_strength = min(7, denoise_strength + 1)  # 低阈值时增加去噪
+        
+        if denoise_strength <= 0:
+            return None
+        kernel_size = min(2 * denoise_strength + 1, 15)  # 限制最大核大小
+        return kernel_size, denoise_strength
+  
+    def create_white_areas_mask(self, image_array, threshold=70, params=None, morph_kernel=None):
         """
         从图像中识别所有白色区域的mask（包括内部白色区域）
+        params/morph_kernel 为批处理时预先计算好的去噪参数和形态学核
         """
         # 阈值转换为0-255范围
         threshold_255 = int(threshold * 2.55)
@@ -49,31 +104,18 @@ class PD_RemoveWhiteBorder:
         mask = (gray >= threshold_255).astype(np.uint8) * 255
       
         # 动态计算去噪强度：基于图像尺寸和阈值
-        h, w = gray.shape
-        image_size = h * w
-        
-        # 根据图像大小和阈值动态调整去噪强度
-        if image_size > 1000000:  # 大图像 (>1000x1000)
-            denoise_strength = 5
-        elif image_size > 250000:  # 中等图像 (>500x500)
-            denoise_strength = 4
-        else:  # 小图像
-            denoise_strength = 3
-            
-        # 根据阈值微调去噪强度
-        if threshold > 80:
-            denoise_strength = max(1, denoise_strength - 1)  # 高阈值时减少去噪
-        elif threshold < 50:
-            denoise_strength = min(7, denoise_strength + 1)  # 低阈值时增加去噪
+        if params is None:
+            params = self.denoise_params(*gray.shape, threshold)
       
         # 应用去噪和平滑处理
-        if denoise_strength > 0:
+        if params is not None:
+            kernel_size, denoise_strength = params
             # 应用中值滤波去噪，强度可调
-            kernel_size = min(2 * denoise_strength + 1, 15)  # 限制最大核大小
             mask = cv2.medianBlur(mask, kernel_size)
           
             # 应用形态学操作来平滑边缘和连接近邻白色区域
-            morph_kernel = np.ones((denoise_strength, denoise_strength), np.uint8)
+            if morph_kernel is None:
+                morph_kernel = np.ones((denoise_strength, denoise_strength), np.uint8)
             # 开运算：先腐蚀后膨胀，去除小噪点
             mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, morph_kernel)
             # 闭运算：先膨胀后腐蚀，连接断开的区域
@@ -87,7 +129,56 @@ class PD_RemoveWhiteBorder:
       
         return mask_result
   
-    def extract_white_areas(self, image, threshold=70):
+    def create_white_areas_mask_torch(self, images, threshold=70, params=None):
+        """
+        整批在张量所在设备上生成白色区域mask，结果与 OpenCV 版本一致
+        images: uint8 张量 (B, H, W, C)，返回 float32 (B, H, W)
+        """
+        # 与 cv2.COLOR_RGB2GRAY 相同的定点数灰度公式
+        coeffs = gray_coefficients()
+        if coeffs is not None:
+            r2y, g2y, b2y, shift = coeffs
+            rgb = images[..., :3].to(torch.int32)
+            gray = (rgb[..., 0] * r2y + rgb[..., 1] * g2y + rgb[..., 2] * b2y + (1 << (shift - 1))) >> shift
+        else:
+            # 未知的 OpenCV 版本，灰度仍交给 OpenCV 计算
+            gray = torch.from_numpy(np.stack([
+                cv2.cvtColor(np.ascontiguousarray(frame[..., :3]), cv2.COLOR_RGB2GRAY)
+                for frame in images.cpu().numpy()
+            ])).to(images.device)
+        
+        # 检测所有白色区域，0/1 浮点掩码 (B, 1, H, W)
+        mask = (gray >= int(threshold * 2.55)).to(torch.float32).unsqueeze(1)
+        
+        if params is not None:
+            kernel_size, denoise_strength = params
+            # 二值图的中值滤波等价于多数表决：窗口内白色像素超过一半即为白色（边界按复制填充）
+            pad = kernel_size // 2
+            padded = F.pad(mask, (pad, pad, pad, pad), mode="replicate")
+            counts = F.avg_pool2d(padded, kernel_size, stride=1) * (kernel_size * kernel_size)
+            mask = (counts > kernel_size * kernel_size / 2).to(torch.float32)
+            
+            # 开运算 + 闭运算
+            mask = self._dilate(self._erode(mask, denoise_strength), denoise_strength)
+            mask = self._erode(self._dilate(mask, denoise_strength), denoise_strength)
+        
+        # 内部反转：将白色区域变为黑色，其他区域变为白色
+        return 1.0 - mask[:, 0]
+  
+    @staticmethod
+    def _dilate(mask, size):
+        """方形核膨胀，锚点与 OpenCV 一致（偶数核偏向左上），画面外视为 0"""
+        before = size // 2
+        after = size - 1 - before
+        padded = F.pad(mask, (before, after, before, after), value=0.0)
+        return F.max_pool2d(padded, size, stride=1)
+  
+    @classmethod
+    def _erode(cls, mask, size):
+        """方形核腐蚀，画面外视为 1"""
+        return 1.0 - cls._dilate(1.0 - mask, size)
+  
+    def extract_white_areas(self, image, threshold=70, engine="opencv"):
         """
         识别所有白色区域，返回原始图像和反转的白色区域mask
         """
@@ -95,41 +186,32 @@ class PD_RemoveWhiteBorder:
         if len(image.shape) != 4:
             raise ValueError(f"输入图像张量格式错误，期望 (B, H, W, C)，实际 {image.shape}")
       
-        batch_size = image.shape[0]
-        result_images = []
-        masks = []
-      
-        for i in range(batch_size):
-            # 获取单张图片 (H, W, C)
-            single_image = image[i]
-          
-            # 转换为numpy数组 (0-255)
-            if single_image.dtype == torch.float32:
-                # 假设输入是0-1范围的float32
-                image_array = (single_image.cpu().numpy() * 255).astype(np.uint8)
-            else:
-                image_array = single_image.cpu().numpy()
-          
-            # 创建所有白色区域的反转mask
-            mask_array = self.create_white_areas_mask(image_array, threshold)
-          
-            # 将mask转换为PyTorch张量，确保格式为(H, W)
-            mask_tensor = torch.from_numpy(mask_array)
-            masks.append(mask_tensor)
-          
-            # 保持原图不变
-            result_tensor = single_image.clone()
-            result_images.append(result_tensor)
-      
-        # 批次处理
-        if len(result_images) == 1:
-            result = result_images[0].unsqueeze(0)  # (1, H, W, C)
-            mask_result = masks[0].unsqueeze(0)     # (1, H, W)
+        batch_size, height, width = image.shape[:3]
+        
+        # 同一批次的图片尺寸相同，去噪参数和形态学核只计算一次
+        params = self.denoise_params(height, width, threshold)
+        
+        # 整批转换为 0-255 的 uint8
+        if image.dtype.is_floating_point:
+            # 假设输入是0-1范围的浮点数
+            images_255 = (image.float() * 255).to(torch.uint8)
+        else:
+            images_255 = image
+        
+        if engine == "torch":
+            # 在图像所在设备上整批处理，不在 torch 和 NumPy 之间逐帧来回转换
+            mask_result = self.create_white_areas_mask_torch(images_255, threshold, params)
         else:
-            result = torch.stack(result_images)     # (B, H, W, C)
-            mask_result = torch.stack(masks)        # (B, H, W)
+            images_np = images_255.cpu().numpy()
+            morph_kernel = None if params is None else np.ones((params[1], params[1]), np.uint8)
+            mask_result = np.empty((batch_size, height, width), dtype=np.float32)
+            for i in range(batch_size):
+                # 创建所有白色区域的反转mask
+                mask_result[i] = self.create_white_areas_mask(images_np[i], threshold, params, morph_kernel)
+            mask_result = torch.from_numpy(mask_result)
       
-        return (result, mask_result,)
+        # 原图不做修改，直接返回，不再逐帧复制
+        return (image, mask_result,)
 
 
 # 注册节点
@@ -9,6 +9,8 @@ import time
 from datetime import datetime
 import folder_paths
 
+from ._file_counter import allocate, discard_placeholder
+
 class PDTEXT_SAVE_PATH:
     """
     文本保存节点 V3 - 将文本内容保存到指定路径的文件中
@@ -103,31 +105,10 @@ class PDTEXT_SAVE_PATH:
                         full_filename = f"{filename}_{i+1}{file_extension}"
                     else:
                         full_filename = f"{filename}{file_extension}"
-                else:
-                    # 使用数字编号
-                    if len(text_list) > 1:
-                        # 多个文本时，从现有最大编号开始递增
-                        start_counter = self._get_next_counter(output_path, filename, delimiter, padding, number_start, file_extension)
-                        counter = start_counter + i
-                    else:
-                        # 单个文本时，查找现有文件的最大编号
-                        counter = self._get_next_counter(output_path, filename, delimiter, padding, number_start, file_extension)
                     
-                    # 根据number_start生成文件名
-                    # 自动调整位数：如果counter位数超过padding，使用实际位数
-                    actual_padding = max(padding, len(str(counter)))
-                    if number_start:
-                        # 数字在开头: 001_filename.txt
-                        full_filename = f"{counter:0{actual_padding}}{delimiter}{filename}{file_extension}"
-                    else:
-                        # 数字在末尾: filename_001.txt
-                        full_filename = f"{filename}{delimiter}{counter:0{actual_padding}}{file_extension}"
-                
-                # 如果文件仍然存在，继续递增数字直到找到可用的文件名
-                file_path = os.path.join(output_path, full_filename)
-                while os.path.exists(file_path):
-                    if padding == 0:
-                        # 处理无数字编号的情况
+                    # 如果文件已经存在，递增数字后缀直到找到可用的文件名
+                    file_path = os.path.join(output_path, full_filename)
+                    while os.path.exists(file_path):
                         base_name, ext = os.path.splitext(full_filename)
                         # 尝试提取现有的数字后缀
                         match = re.search(r'_(\d+)$', base_name)
@@ -137,20 +118,20 @@ class PDTEXT_SAVE_PATH:
                             full_filename = f"{base_name}_{current_num + 1}{ext}"
                         else:
                             full_filename = f"{base_name}_1{ext}"
-                    else:
-                        # 递增计数器
-                        counter += 1
-                        actual_padding = max(padding, len(str(counter)))
-                        if number_start:
-                            full_filename = f"{counter:0{actual_padding}}{delimiter}{filename}{file_extension}"
-                        else:
-                            full_filename = f"{filename}{delimiter}{counter:0{actual_padding}}{file_extension}"
-                    
+                        file_path = os.path.join(output_path, full_filename)
+                else:
+                    # 使用数字编号：从现有最大编号加一开始，每个文本依次分配（同时创建空文件占位）
+                    _, full_filename = self._allocate_filename(output_path, filename, delimiter, padding, number_start, file_extension)
                     file_path = os.path.join(output_path, full_filename)
                 
-                # 写入文件
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(text_content)
+                # 写入文件，失败时删除编号模式下的空占位文件
+                try:
+                    with open(file_path, 'w', encoding='utf-8') as f:
+                        f.write(text_content)
+                except Exception:
+                    if padding != 0:
+                        discard_placeholder(file_path)
+                    raise
                 
                 saved_files.append(file_path)
                 print(f"[PDTEXT_SAVE_PATH_V3] 文本已保存到: {file_path}")
@@ -162,42 +143,39 @@ class PDTEXT_SAVE_PATH:
             print(f"[PDTEXT_SAVE_PATH_V3] 保存文本时发生错误: {e}")
             return (False, 0)
 
-    def _get_next_counter(self, output_path, filename, delimiter, padding, number_start, file_extension):
+    def _allocate_filename(self, output_path, filename, delimiter, padding, number_start, file_extension):
         """
-        获取下一个可用的计数器值
+        分配下一个可用的编号和文件名，返回 (编号, 文件名)
+        首次保存或目录被外部改动时扫描现有最大编号，之后直接沿用缓存的编号
         """
-        try:
-            if not os.path.exists(output_path):
-                return 1
-            
-            # 根据number_start决定正则表达式模式
+        # 根据number_start决定正则表达式模式
+        if number_start:
+            # 数字在开头: 001_filename.txt (匹配任意位数字)
+            pattern = re.compile(
+                f"(\\d+){re.escape(delimiter)}{re.escape(filename)}{re.escape(file_extension)}$"
+            )
+        else:
+            # 数字在末尾: filename_001.txt (匹配任意位数字)
+            pattern = re.compile(
+                f"{re.escape(filename)}{re.escape(delimiter)}(\\d+){re.escape(file_extension)}$"
+            )
+
+        def scan(names):
+            numbers = [int(match.group(1)) for match in map(pattern.match, names) if match]
+            return max(numbers) + 1 if numbers else 1
+
+        def make_name(counter):
+            # 自动调整位数：如果counter位数超过padding，使用实际位数
+            actual_padding = max(padding, len(str(counter)))
             if number_start:
-                # 数字在开头: 001_filename.txt (匹配任意位数字)
-                pattern = re.compile(
-                    f"(\\d+){re.escape(delimiter)}{re.escape(filename)}{re.escape(file_extension)}$"
-                )
-            else:
-                # 数字在末尾: filename_001.txt (匹配任意位数字)
-                pattern = re.compile(
-                    f"{re.escape(filename)}{re.escape(delimiter)}(\\d+){re.escape(file_extension)}$"
-                )
-            
-            existing_files = os.listdir(output_path)
-            numbers = []
-            
-            for f in existing_files:
-                match = pattern.match(f)
-                if match:
-                    numbers.append(int(match.group(1)))
-            
-            if numbers:
-                return max(numbers) + 1
-            else:
-                return 1
-                
-        except Exception as e:
-            print(f"[PDTEXT_SAVE_PATH_V3] 获取计数器失败: {e}")
-            return 1
+                # 数字在开头: 001_filename.txt
+                return f"{counter:0{actual_padding}}{delimiter}{filename}{file_extension}"
+            # 数字在末尾: filename_001.txt
+            return f"{filename}{delimiter}{counter:0{actual_padding}}{file_extension}"
+
+        key = ("PDTEXT_SAVE_PATH", filename, delimiter, padding, number_start, file_extension)
+        return allocate(output_path, key, make_name, scan)
+
 
 # 节点类映射：将类名映射到实际的类
 NODE_CLASS_MAPPINGS = {
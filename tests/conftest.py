@@ -0,0 +1,25 @@
+"""
+测试用的节点模块导入：以包内子模块的方式导入 py/ 下的文件，不执行 __init__.py 加载全部节点
+需要 ComfyUI 运行环境（comfy、folder_paths）的模块不在这里测试
+"""
+
+import importlib
+import os
+import sys
+import types
+
+import pytest
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE_NAME = "pduse_tests"
+
+
+@pytest.fixture
+def node_module():
+    def load(module_name):
+        if PACKAGE_NAME not in sys.modules:
+            package = types.ModuleType(PACKAGE_NAME)
+            package.__path__ = [BASE_DIR]
+            sys.modules[PACKAGE_NAME] = package
+        return importlib.import_module(f"{PACKAGE_NAME}.py.{module_name}")
+    return load
@@ -0,0 +1,42 @@
+import os
+import re
+
+
+def allocate_next(counter_module, output_dir):
+    pattern = re.compile(r"(\d+)_R\.png$")
+
+    def scan(names):
+        numbers = [int(m.group(1)) for m in map(pattern.match, names) if m]
+        return max(numbers) + 1 if numbers else 1
+
+    return counter_module.allocate(str(output_dir), "R", lambda n: f"{n}_R.png", scan)
+
+
+def test_allocate_creates_placeholders_in_order(node_module, tmp_path):
+    counter = node_module("_file_counter")
+
+    assert [allocate_next(counter, tmp_path)[1] for _ in range(3)] == ["1_R.png", "2_R.png", "3_R.png"]
+    assert all(os.path.getsize(tmp_path / f"{n}_R.png") == 0 for n in (1, 2, 3))
+
+
+def test_discarded_placeholder_number_is_reused(node_module, tmp_path):
+    counter = node_module("_file_counter")
+    _, first = allocate_next(counter, tmp_path)
+    (tmp_path / first).write_bytes(b"png")
+    _, failed = allocate_next(counter, tmp_path)
+
+    counter.discard_placeholder(str(tmp_path / failed))
+
+    assert not (tmp_path / failed).exists()
+    assert allocate_next(counter, tmp_path)[1] == failed
+
+
+def test_discard_keeps_written_files(node_module, tmp_path):
+    counter = node_module("_file_counter")
+    _, name = allocate_next(counter, tmp_path)
+    (tmp_path / name).write_bytes(b"png")
+
+    counter.discard_placeholder(str(tmp_path / name))
+
+    assert (tmp_path / name).read_bytes() == b"png"
+    assert allocate_next(counter, tmp_path)[1] == "2_R.png"
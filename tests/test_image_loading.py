@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+import torch
+from PIL import Image
+
+
+def save_rgba(path, opaque_rows=4):
+    """8×12 红色图像，上面 opaque_rows 行透明"""
+    pixels = np.zeros((8, 12, 4), dtype=np.uint8)
+    pixels[..., 0] = 255
+    pixels[..., 3] = 255
+    pixels[:opaque_rows, :, 3] = 0
+    Image.fromarray(pixels, "RGBA").save(path)
+    return pixels
+
+
+@pytest.mark.parametrize("storage, dtype", [("float32", torch.float32), ("float16", torch.float16)])
+def test_loaded_image_and_mask_dtype(node_module, tmp_path, storage, dtype):
+    loading = node_module("_image_loading")
+    pixels = save_rgba(tmp_path / "rgba.png")
+    Image.fromarray(pixels[..., :3]).save(tmp_path / "rgb.png")
+
+    image, mask = loading.load_image_tensor(str(tmp_path / "rgba.png"), storage=storage)
+
+    assert image.dtype == dtype and mask.dtype == dtype
+    assert image.shape == (1, 8, 12, 3) and mask.shape == (8, 12)
+    assert image[..., 0].max() == 1.0 and image.min() == 0.0
+    # 透明区域遮罩为 1，不透明区域为 0
+    assert torch.equal(mask.float(), torch.cat([torch.ones(4, 12), torch.zeros(4, 12)]))
+
+    _, mask = loading.load_image_tensor(str(tmp_path / "rgb.png"), storage=storage)
+    assert mask.dtype == dtype and mask.shape == (8, 12) and mask.float().max() == 0.0
+
+
+@pytest.mark.parametrize("storage", ["float32", "float16"])
+def test_constant_mask_is_writable(node_module, tmp_path, storage):
+    loading = node_module("_image_loading")
+    Image.fromarray(np.full((8, 12, 3), 128, dtype=np.uint8)).save(tmp_path / "rgb.png")
+
+    _, mask = loading.load_image_tensor(str(tmp_path / "rgb.png"), storage=storage)
+    # 下游节点常见的原地修改：只改一个像素，其他像素不受影响
+    mask.clamp_(0, 1)
+    mask[0, 0] = 1.0
+    assert mask.sum() == 1.0
+
+    full = loading.constant_mask(8, 12, 1.0, storage)
+    full[full > 0.5] = 0
+    full[2, 3] = 1.0
+    assert full.sum() == 1.0
@@ -0,0 +1,63 @@
+import numpy as np
+import torch
+
+
+def square_batch():
+    """两帧黑底图像：第 0 帧左上角有 0.8 的方块，第 1 帧右下角有 0.5 的方块"""
+    image = torch.zeros((2, 64, 64, 3))
+    image[0, 8:24, 8:24] = 0.8
+    image[1, 40:60, 40:60] = 0.5
+    return image
+
+
+def test_float_batch_outputs_comfy_layout(node_module):
+    node = node_module("mask_edge_selector").mask_edge_selector()
+    image = square_batch()
+
+    result_image, result_mask, mask_image = node.select_extreme(image, "max")
+
+    assert isinstance(result_image, torch.Tensor) and result_image.shape == (2, 64, 64, 3)
+    assert isinstance(result_mask, torch.Tensor) and result_mask.shape == (2, 64, 64)
+    assert mask_image.shape == (2, 64, 64, 3)
+    assert result_image.dtype == torch.float32 and result_mask.dtype == torch.float32
+
+    # 最大的黑色区域是方块以外的背景
+    expected = (image.mean(-1) == 0).float()
+    assert torch.equal(result_mask, expected)
+    assert torch.equal(mask_image[..., 0], expected)
+    assert result_image.max() == 0
+
+
+def test_float_batch_min_region(node_module):
+    node = node_module("mask_edge_selector").mask_edge_selector()
+    image = torch.full((1, 32, 32, 3), 0.6)
+    image[0, 2:6, 2:6] = 0.0      # 16 像素
+    image[0, 20:30, 20:30] = 0.0  # 100 像素
+
+    _, result_mask, _ = node.select_extreme(image, "min")
+
+    expected = torch.zeros((1, 32, 32))
+    expected[0, 2:6, 2:6] = 1.0
+    assert torch.equal(result_mask, expected)
+
+
+def test_alpha_channel_selects_transparent_region(node_module):
+    node = node_module("mask_edge_selector").mask_edge_selector()
+    image = torch.rand((1, 16, 16, 4)) * 0.5 + 0.5
+    image[0, 4:8, 4:8, 3] = 0.0
+
+    result_image, result_mask, _ = node.select_extreme(image, "max")
+
+    assert result_mask[0, 4:8, 4:8].all() and result_mask.sum() == 16
+    assert torch.equal(result_image[0, 4:8, 4:8], image[0, 4:8, 4:8, :3])
+
+
+def test_uint8_input_matches_float(node_module):
+    node = node_module("mask_edge_selector").mask_edge_selector()
+    image = square_batch()
+    as_uint8 = (image.numpy() * 255).round().astype(np.uint8)
+
+    float_outputs = node.select_extreme(image, "max")
+    uint8_outputs = node.select_extreme(as_uint8, "max")
+
+    assert torch.equal(float_outputs[1], uint8_outputs[1])
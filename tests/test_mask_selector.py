@@ -0,0 +1,57 @@
+import json
+
+import torch
+
+
+def five_squares():
+    """一帧 64×160 遮罩，从左到右 5 个方块，边长依次为 6、14、10、18、8（面积都不同）"""
+    mask = torch.zeros((1, 64, 160))
+    lefts = [4, 30, 60, 90, 130]
+    sizes = [6, 14, 10, 18, 8]
+    for x, s in zip(lefts, sizes):
+        mask[0, 20:20 + s, x:x + s] = 1.0
+    image = torch.rand((1, 64, 160, 3))
+    return image, mask, lefts
+
+
+def test_select_ignores_max_regions(node_module):
+    node = node_module("Mask_selector").PD_MaskSelector()
+    image, mask, lefts = five_squares()
+
+    full = node.select_region(image, mask, select="mask3", min_area=0, padding=0)
+    capped = node.select_region(image, mask, select="mask3", min_area=0, padding=0, max_regions=2)
+
+    assert capped[1].sum() == 10 * 10
+    assert torch.equal(full[0], capped[0]) and torch.equal(full[1], capped[1])
+    assert json.loads(capped[4])[0]["x"] == lefts[2]
+
+
+def test_max_regions_caps_list_outputs(node_module):
+    node = node_module("Mask_selector").PD_MaskSelector()
+    image, mask, lefts = five_squares()
+
+    _, out_mask, region_images, _, bboxes = node.select_region(
+        image, mask, select="mask4", sort_by="left_to_right", min_area=0, padding=0,
+        all_regions=True, max_regions=2)
+
+    assert out_mask.sum() == 18 * 18
+    assert len(region_images) == 2
+    assert [b["x"] for b in json.loads(bboxes)] == lefts[:2]
+
+
+def test_by_area_select_uses_top_four(node_module):
+    node = node_module("Mask_selector_by_area_left").PD_MaskSelectorByAreaLeft()
+    image, mask, lefts = five_squares()
+
+    # 面积最大的 4 个从左到右为 14、10、18、8 的方块，mask3 为 18 的方块
+    _, out_mask, x, _, region_images, _, bboxes = node.select_region(
+        image, mask, select="mask3", padding=0, all_regions=True, max_regions=2)
+
+    assert out_mask.sum() == 18 * 18 and x == lefts[3]
+    # 列表输出为面积最大的 2 个，从左到右
+    assert len(region_images) == 2
+    assert [b["x"] for b in json.loads(bboxes)] == [lefts[1], lefts[3]]
+
+    _, _, _, _, region_images, _, _ = node.select_region(image, mask, select="mask3", padding=0, max_regions=0,
+                                                         all_regions=True)
+    assert len(region_images) == 5
@@ -0,0 +1,59 @@
+import cv2
+import numpy as np
+import pytest
+import torch
+
+
+def sticker_sheet(seed, objects=12, size=160):
+    """黑色前景、白色背景的多对象遮罩：随机圆和矩形，部分对象之间有细桥相连"""
+    rng = np.random.default_rng(seed)
+    mask = np.ones((size, size), dtype=np.float32)
+    centers = []
+    for _ in range(objects):
+        cx, cy = (int(v) for v in rng.integers(10, size - 10, size=2))
+        if rng.random() < 0.5:
+            cv2.circle(mask, (cx, cy), int(rng.integers(3, 12)), 0.0, -1)
+        else:
+            w, h = (int(v) for v in rng.integers(3, 14, size=2))
+            cv2.rectangle(mask, (cx - w, cy - h), (cx + w, cy + h), 0.0, -1)
+        centers.append((cx, cy))
+    for a, b in zip(centers[::3], centers[1::3]):
+        cv2.line(mask, a, b, 0.0, 1)
+    image = torch.from_numpy(np.random.default_rng(seed + 100).random((size, size, 3), dtype=np.float32))
+    return image.unsqueeze(0), torch.from_numpy(mask).unsqueeze(0)
+
+
+def reference_masks(mask, min_area, split_iterations):
+    """逐个对象在整张图上膨胀种子并限制在原前景内，返回排序后的各对象遮罩像素数"""
+    binary = (mask[0].numpy() < 0.5).astype(np.uint8)
+    split = cv2.erode(binary, np.ones((3, 3), np.uint8), iterations=split_iterations) if split_iterations else binary
+    if split_iterations and not np.any(split):
+        split = binary
+    num_labels, labels, stats, _ = cv2.connectedComponentsWithStats(split, connectivity=8)
+    areas = []
+    for label in range(1, num_labels):
+        if stats[label, cv2.CC_STAT_AREA] < min_area:
+            continue
+        seed = (labels == label).astype(np.uint8)
+        if split_iterations:
+            seed = cv2.dilate(seed, np.ones((3, 3), np.uint8), iterations=split_iterations)
+        areas.append(int(np.logical_and(seed > 0, binary > 0).sum()))
+    return sorted(areas)
+
+
+@pytest.mark.parametrize("seed", range(6))
+@pytest.mark.parametrize("split_iterations", [0, 1, 2, 4])
+def test_regrown_masks_match_full_frame_dilation(node_module, seed, split_iterations):
+    node = node_module("Maskfenkai").PD_Maskfenkai()
+    image, mask = sticker_sheet(seed)
+
+    images, masks = node.split_objects(image, mask, min_area=4, row_tolerance=10,
+                                       split_iterations=split_iterations, bbox_padding=8)
+
+    assert len(images) == len(masks) > 1
+    for crop, crop_mask in zip(images, masks):
+        assert crop.shape[:3] == (1, *crop_mask.shape[1:])
+        assert crop_mask.dtype == torch.float32
+    # bbox_padding 不小于膨胀次数，裁剪不会截掉膨胀结果，各对象的遮罩像素数与整图计算一致
+    assert sorted(int(m.sum()) for m in masks) == reference_masks(mask, 4, split_iterations)
+
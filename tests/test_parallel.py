@@ -0,0 +1,35 @@
+import threading
+
+
+def test_tasks_run_in_worker_threads(node_module):
+    parallel = node_module("_parallel")
+
+    # lambda 无法序列化，只能在线程中执行
+    results = sorted(parallel.run_tasks(lambda task: (task, threading.current_thread().name), [1, 2, 3], workers=2))
+
+    assert [index for index, _, _ in results] == [0, 1, 2]
+    assert [result[0] for _, result, _ in results] == [1, 2, 3]
+    assert all(error is None for _, _, error in results)
+    assert all(result[1].startswith("pd_batch") for _, result, _ in results)
+
+
+def test_errors_are_reported_per_task(node_module):
+    parallel = node_module("_parallel")
+
+    def fail_on_two(task):
+        if task == 2:
+            raise ValueError("bad")
+        return task
+
+    results = sorted(parallel.run_tasks(fail_on_two, [1, 2, 3], workers=2), key=lambda r: r[0])
+
+    assert [(index, result) for index, result, _ in results] == [(0, 1), (1, None), (2, 3)]
+    assert isinstance(results[1][2], ValueError)
+
+
+def test_serial_when_single_worker(node_module):
+    parallel = node_module("_parallel")
+
+    results = list(parallel.run_tasks(abs, [-1, -2], workers=1))
+
+    assert results == [(0, 1, None), (1, 2, None)]
@@ -0,0 +1,22 @@
+import torch
+
+
+def test_remove_black_background_is_quiet_by_default(node_module, capsys):
+    node = node_module("png").PD_RemoveBlackBackground()
+    image = torch.zeros((2, 8, 8, 3))
+    image[:, 2:6, 2:6] = 1.0
+
+    _, mask = node.remove_black_background(image, threshold=0.5, smooth_edges=False)
+
+    assert capsys.readouterr().out == ""
+    assert mask.shape == (2, 8, 8) and mask.sum() == 2 * 16
+
+
+def test_remove_black_background_verbose_reports_first_image(node_module, capsys):
+    node = node_module("png").PD_RemoveBlackBackground()
+    image = torch.zeros((1, 8, 8, 3))
+    image[:, :4] = 1.0
+
+    node.remove_black_background(image, threshold=0.5, verbose=True)
+
+    assert "检测到暗色像素: 32/64 (50.0%)" in capsys.readouterr().out